@@ -1,13 +1,25 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for
+from dotenv import load_dotenv
+load_dotenv()
+
+from flask import Flask, Response, render_template, request, jsonify, redirect, url_for
 from flask_socketio import SocketIO, emit, join_room, leave_room
-from werkzeug.utils import secure_filename
+import click
+import assets
 import db
+import bulk
+import hashing
+import images
+import metrics
+import profiling
+import socket_queue
+from typing_indicators import TypingTracker, TYPING_SWEEP_MS
+from presence import PresenceRegistry
+from matching import matching_bp
+from hashing import HashPoolFull
 import os
 import json
-import uuid
 
-# Configure upload folder
-UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'uploads')
+# Profile photos are stored and resized by images.py
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
 
 def allowed_file(filename):
@@ -15,10 +27,37 @@ def allowed_file(filename):
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'generalink-secret-key'
-socketio = SocketIO(app, cors_allowed_origins="*")
-
-# Initialize DB (seeds data to Supabase if needed)
-db.init_db()
+# Larger uploads are rejected with 413 before they are read
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get("MAX_UPLOAD_MB", 20)) * 1024 * 1024
+# With SOCKETIO_MESSAGE_QUEUE set, room emits reach clients on every worker
+socketio = SocketIO(app, cors_allowed_origins="*", **socket_queue.socketio_options())
+
+# Fingerprinted static files and the asset_url() template helper
+assets.init_app(app)
+
+# Request/Socket.IO/database timings, served at /api/metrics
+metrics.init_app(app)
+metrics.register_gauges('profile_cache', db.profile_cache.stats, 'Shared profile LRU cache statistics.')
+metrics.register_gauges('hash_pool', hashing.stats, 'Password hashing pool statistics.')
+metrics.register_gauges('image_pipeline', images.stats, 'Profile photo processing pool statistics.')
+
+# Socket.IO connections per user on this worker (see SocketIO Events below).
+# Only accurate with a single worker; see presence.py
+presence = PresenceRegistry()
+metrics.register_gauges('presence', presence.stats, 'Users and identified Socket.IO connections on this worker.')
+# Opt-in slow-request log, toggled at runtime via /api/admin/profiling
+profiling.init_app(app)
+
+# Share profile cache invalidations between workers when more than one runs
+if os.environ.get('CACHE_INVALIDATION_URL'):
+    from cache import RedisInvalidationChannel
+    invalidation_channel = RedisInvalidationChannel(os.environ['CACHE_INVALIDATION_URL'])
+    db.set_profile_invalidation_channel(invalidation_channel)
+    metrics.register_gauges('cache_invalidation', invalidation_channel.stats,
+                            'Profile cache invalidation subscriber (connected is 1 or 0).')
+
+# /matching, /matches and the recommendation API (see matching.py)
+app.register_blueprint(matching_bp)
 
 # --- Page Routes ---
 
@@ -46,14 +85,6 @@ def reset_password():
 def onboarding():
     return render_template('onboarding.html')
 
-@app.route('/matching')
-def matching():
-    return render_template('matching.html')
-
-@app.route('/matches')
-def matches_view():
-    return render_template('matches.html')
-
 @app.route('/chat')
 def chat_list():
     return render_template('chat.html')
@@ -81,37 +112,102 @@ def admin():
 def health_check():
     return jsonify({"status": "ok"})
 
+@app.route('/api/metrics')
+def metrics_endpoint():
+    """Prometheus text exposition of request, Socket.IO and database metrics."""
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/api/ready')
+def readiness_check():
+    """Readiness probe: unlike /api/health, checks the storage backend is reachable."""
+    try:
+        db.ping()
+        return jsonify({"status": "ready", "backend": db.get_backend().name})
+    except Exception as e:
+        return jsonify({"status": "unavailable", "error": str(e)}), 503
+
+# participantIds per message; a conversation is two users, or a small group
+MAX_PARTICIPANTS = 50
+# Chat is unavailable until legacy kv_store messages have been migrated
+MIGRATION_PENDING = "Chat is unavailable until `flask --app app migrate-messages` has been run"
+
 @app.route('/api/messages/<conversation_id>', methods=['GET'])
 def get_messages(conversation_id):
     try:
-        messages = db.get_messages(conversation_id)
-        return jsonify({"success": True, "messages": messages})
+        if not db.messages_migrated():
+            return jsonify({"success": False, "error": MIGRATION_PENDING}), 503
+        # `since` is the last message id the client has seen (delta sync)
+        after = request.args.get('after', type=int)
+        if after is None:
+            after = request.args.get('since', type=int)
+        before = request.args.get('before', type=int)
+        if before is not None and after is not None:
+            return jsonify({"success": False, "error": "Use either before or after, not both"}), 400
+        limit = request.args.get('limit', db.MESSAGE_PAGE_SIZE, type=int)
+
+        messages, has_more = db.get_messages(conversation_id, before=before, after=after, limit=limit)
+        return jsonify({
+            "success": True,
+            "messages": messages,
+            "hasMore": has_more,
+            "oldestId": messages[0]['id'] if messages else before,
+            "newestId": messages[-1]['id'] if messages else after
+        })
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
 @app.route('/api/messages', methods=['POST'])
 def send_message():
     try:
+        if not db.messages_migrated():
+            return jsonify({"success": False, "error": MIGRATION_PENDING}), 503
         data = request.json
         conversation_id = data.get('conversationId')
         message = data.get('message')
         
         if not conversation_id or not message:
             return jsonify({"success": False, "error": "Missing conversationId or message"}), 400
+        # Everyone in the conversation, so recipients who have never joined
+        # the room still get it in /api/conversations with an unread count
+        participant_ids = data.get('participantIds') or []
+        if not isinstance(participant_ids, list) or len(participant_ids) > MAX_PARTICIPANTS \
+                or not all(isinstance(p, str) and p for p in participant_ids):
+            return jsonify({"success": False, "error": f"participantIds must be a list of at most {MAX_PARTICIPANTS} user ids"}), 400
             
-        new_msg = db.save_message(conversation_id, message)
+        new_msg = db.save_message(conversation_id, message, participant_ids)
         
         # Emit real-time event to the conversation room
         socketio.emit('new_message', {
             'conversationId': conversation_id,
             'message': new_msg
         }, room=conversation_id)
+        if typing_tracker.clear(conversation_id, new_msg['senderId']):
+            _broadcast_typing_stop(conversation_id, new_msg['senderId'])
+        else:
+            # The sender's socket may be on another worker, which holds the state
+            _share_typing_stop(conversation_id, new_msg['senderId'])
         
         return jsonify({"success": True, "message": new_msg})
     except Exception as e:
         print(f"Error sending message: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
 
+@app.route('/api/conversations', methods=['GET'])
+def get_conversations():
+    """Conversation list with unread counts, without fetching any history"""
+    try:
+        user_id = request.args.get('userId')
+        if not user_id:
+            return jsonify({"success": False, "error": "Missing userId"}), 400
+        return jsonify({"success": True, "conversations": db.get_conversations(user_id)})
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/presence', methods=['GET'])
+def get_presence():
+    user_ids = [u for u in request.args.get('userIds', '').split(',') if u]
+    return jsonify({"success": True, "online": presence.online(user_ids)})
+
 @app.route('/api/report', methods=['POST'])
 def submit_report():
     try:
@@ -127,6 +223,76 @@ def submit_report():
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
+@app.route('/api/admin/reports', methods=['GET'])
+def list_reports():
+    try:
+        status = request.args.get('status')
+        if status and status not in db.REPORT_STATUSES:
+            return jsonify({"success": False, "error": "Invalid status"}), 400
+
+        reports, has_more = db.get_reports(
+            status=status,
+            reason=request.args.get('reason'),
+            conversation_id=request.args.get('conversationId'),
+            since=request.args.get('since'),
+            until=request.args.get('until'),
+            before=request.args.get('before', type=int),
+            limit=request.args.get('limit', db.REPORT_PAGE_SIZE, type=int)
+        )
+        return jsonify({
+            "success": True,
+            "reports": reports,
+            "hasMore": has_more,
+            "nextBefore": reports[-1]['id'] if reports and has_more else None
+        })
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/admin/reports/counts', methods=['GET'])
+def report_counts():
+    try:
+        return jsonify({"success": True, "counts": db.get_report_counts()})
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/admin/profiling', methods=['GET', 'POST'])
+def admin_profiling():
+    """Read or change the slow-request log settings of this worker."""
+    try:
+        if request.method == 'POST':
+            data = request.json or {}
+            settings = profiling.configure(
+                enabled=data.get('enabled'),
+                threshold_ms=data.get('thresholdMs'),
+                sample_rate=data.get('sampleRate')
+            )
+        else:
+            settings = dict(profiling.settings)
+        return jsonify({"success": True, "profiling": settings})
+    except (TypeError, ValueError) as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/admin/reports/<int:report_id>', methods=['POST'])
+def update_report(report_id):
+    try:
+        status = (request.json or {}).get('status')
+        if status not in db.REPORT_STATUSES:
+            return jsonify({"success": False, "error": "Invalid status"}), 400
+
+        report = db.update_report_status(report_id, status)
+        if report:
+            return jsonify({"success": True, "report": report})
+        return jsonify({"success": False, "error": "Report not found"}), 404
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+def hash_pool_full_response(e):
+    response = jsonify({"success": False, "error": str(e), "retryable": True})
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response, 503
+
 @app.route('/api/login', methods=['POST'])
 def api_login():
     try:
@@ -143,6 +309,8 @@ def api_login():
              return jsonify({"success": True, "user": {"id": "admin", "email": email, "isAdmin": True}})
              
         return jsonify({"success": False, "error": "Invalid credentials"}), 401
+    except HashPoolFull as e:
+        return hash_pool_full_response(e)
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
@@ -159,6 +327,8 @@ def api_signup():
             return jsonify({"success": True, "user": user})
         else:
             return jsonify({"success": False, "error": "User already exists"}), 409
+    except HashPoolFull as e:
+        return hash_pool_full_response(e)
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
@@ -195,6 +365,23 @@ def profile_api():
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
+@app.route('/api/admin/profiles', methods=['POST'])
+def bulk_update_profiles():
+    """Patch many profiles at once, e.g. {"userIds": [...], "updates": {"verified": true}}
+    or {"patches": {"<userId>": {...}, ...}}."""
+    try:
+        data = request.json or {}
+        patches = data.get('patches')
+        if patches is None and data.get('userIds') and data.get('updates'):
+            patches = {user_id: data['updates'] for user_id in data['userIds']}
+        if not patches:
+            return jsonify({"success": False, "error": "Missing patches or userIds/updates"}), 400
+
+        profiles = db.update_user_profiles(patches)
+        return jsonify({"success": True, "updated": len(profiles), "profiles": profiles})
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
 @app.route('/api/profile/photo', methods=['POST'])
 def upload_profile_photo():
     try:
@@ -211,26 +398,23 @@ def upload_profile_photo():
             return jsonify({"success": False, "error": "No file selected"}), 400
         
         if file and allowed_file(file.filename):
-            # Generate unique filename
-            ext = file.filename.rsplit('.', 1)[1].lower()
-            filename = f"{user_id}_{uuid.uuid4().hex[:8]}.{ext}"
-            filename = secure_filename(filename)
-            
-            # Ensure upload folder exists
-            os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-            
-            # Save file
-            filepath = os.path.join(UPLOAD_FOLDER, filename)
-            file.save(filepath)
-            
-            # Update user profile with photo URL
-            photo_url = f"/static/uploads/{filename}"
-            db.update_user_profile(user_id, {"photo": photo_url})
-            
-            return jsonify({"success": True, "photoUrl": photo_url})
+            # Streamed to disk here; EXIF fix, WebP and thumbnails happen in the background
+            result = images.upload_profile_photo(user_id, file)
+            if result is None:
+                return jsonify({"success": False, "error": "User not found"}), 404
+            status, variants = result
+
+            return jsonify({
+                "success": True,
+                "photoUrl": variants['large'],
+                "photoVariants": variants,
+                "status": status
+            })
         else:
             return jsonify({"success": False, "error": "Invalid file type. Allowed: png, jpg, jpeg, gif, webp"}), 400
             
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
@@ -240,7 +424,10 @@ def get_potential_matches():
         user_id = request.args.get('userId')
         if not user_id: return jsonify({"success": False, "error": "Missing userId"}), 400
         
-        profiles = db.get_potential_matches(user_id)
+        limit = request.args.get('limit', type=int)
+        offset = request.args.get('offset', 0, type=int)
+
+        profiles = db.get_potential_matches(user_id, limit=limit, offset=offset)
         return jsonify({"success": True, "profiles": profiles})
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
@@ -276,8 +463,13 @@ def match_ops():
 def stories_api():
     try:
         if request.method == 'GET':
-            stories = db.get_all_stories()
-            return jsonify({"success": True, "stories": stories})
+            limit = request.args.get('limit', db.STORY_PAGE_SIZE, type=int)
+            cursor = request.args.get('cursor')
+            try:
+                stories, next_cursor = db.get_stories(limit=limit, cursor=cursor)
+            except ValueError as e:
+                return jsonify({"success": False, "error": str(e)}), 400
+            return jsonify({"success": True, "stories": stories, "nextCursor": next_cursor})
         elif request.method == 'POST':
             data = request.json
             author_id = data.get('authorId')
@@ -309,29 +501,177 @@ def get_users():
 
 # --- SocketIO Events ---
 
+def _identify(user_id):
+    """Attach this socket to `user_id`, with a per-user room for its other tabs/devices."""
+    presence.connect(request.sid, user_id)
+    join_room(f'user:{user_id}')
+
+@socketio.on('connect')
+def on_connect(auth=None):
+    user_id = (auth or {}).get('userId') if isinstance(auth, dict) else None
+    if user_id:
+        _identify(user_id)
+
 @socketio.on('join')
+@metrics.timed_event('join')
 def on_join(data):
     """Join a conversation room for real-time updates"""
     room = data.get('conversationId')
     if room:
         join_room(room)
+        presence.join(request.sid, room)
         print(f"User joined room: {room}")
 
+        user_id = data.get('userId')
+        if user_id:
+            _identify(user_id)
+            db.join_conversation(room, user_id)
+        # Only once per user coming online, not on every join
+        announced = presence.announce(request.sid)
+        if announced:
+            emit('presence', {'userId': announced, 'online': True}, room=room, include_self=False)
+
+        # On reconnect, send only what the client missed while it was away.
+        # An id we can't use (legacy or malformed) gets the latest page instead.
+        last_seen_id = data.get('lastSeenId')
+        if last_seen_id is not None and db.messages_migrated():
+            try:
+                after = int(last_seen_id)
+            except (TypeError, ValueError):
+                after = None
+            messages, has_more = db.get_messages(room, after=after)
+            emit('missed_messages', {
+                'conversationId': room,
+                'messages': messages,
+                'hasMore': has_more
+            })
+
 @socketio.on('leave')
+@metrics.timed_event('leave')
 def on_leave(data):
     """Leave a conversation room"""
     room = data.get('conversationId')
     if room:
         leave_room(room)
+        presence.leave(request.sid, room)
         print(f"User left room: {room}")
 
+@socketio.on('mark_read')
+@metrics.timed_event('mark_read')
+def on_mark_read(data):
+    """Reset the user's unread count for a conversation"""
+    room = data.get('conversationId')
+    user_id = data.get('userId') or presence.user_for(request.sid)
+    if room and user_id:
+        conversation = db.mark_conversation_read(room, user_id)
+        # Every open tab/device of the user clears its badge
+        emit('conversation_read', conversation, room=f'user:{user_id}')
+
+# Who is typing in which room; only started/stopped transitions are broadcast
+typing_tracker = TypingTracker()
+_typing_sweeper = None
+
+# State lives on the worker holding the typing socket, but the same user can
+# type into a room from tabs on different workers, and messages can be sent
+# over HTTP to any worker. Every stop is shared through the queue (Redis) so
+# no worker keeps a (room, user) the others have already broadcast as stopped.
+typing_channel = socket_queue.create_signal_channel('typing-stop')
+typing_channel.subscribe(lambda key: typing_tracker.clear(*json.loads(key)))
+
+def _share_typing_stop(room, user_id):
+    typing_channel.publish(json.dumps([room, user_id]))
+
+def _broadcast_typing_stop(room, user_id, skip_sid=None):
+    socketio.emit('user_typing', {'userId': user_id, 'isTyping': False}, room=room, skip_sid=skip_sid)
+    _share_typing_stop(room, user_id)
+
+def _typing_sweep_loop():
+    while True:
+        socketio.sleep(TYPING_SWEEP_MS / 1000)
+        try:
+            for room, user_id, sid in typing_tracker.expire():
+                _broadcast_typing_stop(room, user_id, skip_sid=sid)
+        except Exception:
+            app.logger.exception("Error sweeping typing indicators")
+
+def _start_typing_sweeper():
+    global _typing_sweeper
+    if _typing_sweeper is None:
+        _typing_sweeper = socketio.start_background_task(_typing_sweep_loop)
+
 @socketio.on('typing')
+@metrics.timed_event('typing')
 def on_typing(data):
-    """Broadcast typing indicator"""
+    """Broadcast typing indicator transitions (sent per keystroke, or with isTyping: false)"""
     room = data.get('conversationId')
     user_id = data.get('userId')
-    if room:
-        emit('user_typing', {'userId': user_id}, room=room, include_self=False)
+    if not room:
+        return
+
+    if data.get('isTyping', True):
+        if typing_tracker.start(room, user_id, request.sid):
+            _start_typing_sweeper()
+            emit('user_typing', {'userId': user_id, 'isTyping': True}, room=room, include_self=False)
+    elif typing_tracker.stop(room, user_id):
+        _broadcast_typing_stop(room, user_id, skip_sid=request.sid)
+
+@socketio.on('disconnect')
+def on_disconnect(reason=None):
+    for room, user_id in typing_tracker.drop_sid(request.sid):
+        _broadcast_typing_stop(room, user_id, skip_sid=request.sid)
+
+    user_id, rooms, went_offline = presence.disconnect(request.sid)
+    if went_offline:
+        for room in rooms:
+            emit('presence', {'userId': user_id, 'online': False}, room=room, include_self=False)
+
+# --- CLI Commands ---
+
+@app.cli.command('seed')
+def seed_command():
+    """Create the demo users and stories if the database is empty."""
+    db.init_db()
+
+@app.cli.command('import')
+@click.argument('kind', type=click.Choice(bulk.KINDS))
+@click.argument('path')
+@click.option('--format', 'fmt', type=click.Choice(bulk.FORMATS), help='Default: from the file extension.')
+@click.option('--batch-size', default=bulk.BULK_BATCH_SIZE, show_default=True)
+def import_command(kind, path, fmt, batch_size):
+    """Stream users, stories or matches from a JSONL/CSV file ('-' for stdin)."""
+    try:
+        count = bulk.import_records(kind, path, fmt, batch_size,
+                                    progress=lambda n: click.echo(f"  {n} {kind}...", err=True))
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Imported {count} {kind}.")
+
+@app.cli.command('export')
+@click.argument('kind', type=click.Choice(bulk.KINDS))
+@click.argument('path', default='-')
+@click.option('--format', 'fmt', type=click.Choice(bulk.FORMATS), help='Default: from the file extension.')
+def export_command(kind, path, fmt):
+    """Stream every user, story or match to a JSONL/CSV file (default stdout)."""
+    count = bulk.export_records(kind, path, fmt)
+    click.echo(f"Exported {count} {kind}.", err=True)
+
+@app.cli.command('build-assets')
+def build_assets_command():
+    """Write fingerprinted, precompressed copies of static assets to static/dist."""
+    manifest = assets.build()
+    click.echo(f"Built {len(manifest)} assets into {assets.BUILD_FOLDER}.")
+
+@app.cli.command('migrate-messages')
+def migrate_messages_command():
+    """Move legacy kv_store chat blobs into the messages table."""
+    count = db.migrate_kv_messages()
+    click.echo(f"Migrated {count} messages.")
+
+@app.cli.command('migrate-reports')
+def migrate_reports_command():
+    """Move legacy kv_store report blobs into the reports table."""
+    count = db.migrate_kv_reports()
+    click.echo(f"Migrated {count} reports.")
 
 if __name__ == '__main__':
     socketio.run(app, debug=True, port=5000)
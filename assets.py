@@ -0,0 +1,157 @@
+"""Fingerprinted, precompressed static assets.
+
+`flask --app app build-assets` copies everything under ASSET_DIRS into
+BUILD_FOLDER with the content hash in the name, e.g.
+
+    static/css/matching.css -> static/dist/css/matching.3f9a1c2e7b.css
+
+plus .gz (and, with the brotli package installed, .br) copies of text
+files, and writes MANIFEST_PATH {source path: built path}. Templates link
+assets with asset_url('css/matching.css'), which takes the same filename
+as url_for('static', ...). It falls back to the plain static URL for
+anything not in the manifest, so nothing has to be built in development.
+
+Built files never change under the same name, so they are served with a
+one-year immutable Cache-Control and browsers do not ask for them again.
+The manifest does change on every build, so it is kept outside BUILD_FOLDER
+where it would be served that way too.
+The precompressed copy is sent when the client accepts it.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+
+from flask import request, send_from_directory, url_for
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_FOLDER = os.path.join(BASE_DIR, 'static')
+ASSET_DIRS = ['css', 'js', 'images']
+BUILD_FOLDER = os.path.join(STATIC_FOLDER, 'dist')
+MANIFEST_PATH = os.path.join(BASE_DIR, 'asset-manifest.json')
+# Where earlier builds wrote the manifest; removed so it stops being served
+LEGACY_MANIFEST = 'manifest.json'
+HASH_LENGTH = 10
+ASSET_MAX_AGE = 365 * 24 * 3600
+# Already-compressed formats (png, jpg, webp...) are not worth compressing again
+COMPRESSIBLE = {'.css', '.js', '.svg', '.json', '.txt', '.map'}
+# Preferred first
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+_manifest = {}
+
+
+def _fingerprint(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+
+def _source_files(static_folder):
+    for asset_dir in ASSET_DIRS:
+        root = os.path.join(static_folder, asset_dir)
+        for dirpath, _, filenames in os.walk(root):
+            for filename in sorted(filenames):
+                path = os.path.join(dirpath, filename)
+                yield os.path.relpath(path, static_folder).replace(os.sep, '/'), path
+
+
+def _write_compressed(path, data):
+    """Write .gz/.br next to `path` when they come out smaller; return the encodings written."""
+    written = []
+    gz = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(gz) < len(data):
+        with open(path + '.gz', 'wb') as f:
+            f.write(gz)
+        written.append('gzip')
+
+    try:
+        import brotli
+    except ImportError:
+        return written
+    br = brotli.compress(data, quality=11)
+    if len(br) < len(data):
+        with open(path + '.br', 'wb') as f:
+            f.write(br)
+        written.append('br')
+    return written
+
+
+def build(static_folder=STATIC_FOLDER, build_folder=BUILD_FOLDER, manifest_path=MANIFEST_PATH):
+    """Fingerprint and precompress every asset; return the manifest.
+
+    Files from earlier builds are left in place, so pages still open from
+    the previous deploy keep loading.
+    """
+    global _manifest
+    manifest = {}
+    for name, path in _source_files(static_folder):
+        stem, ext = os.path.splitext(name)
+        built_name = f"{stem}.{_fingerprint(path)}{ext}"
+        built_path = os.path.join(build_folder, built_name)
+        os.makedirs(os.path.dirname(built_path), exist_ok=True)
+        if not os.path.exists(built_path):
+            shutil.copyfile(path, built_path)
+        if ext.lower() in COMPRESSIBLE:
+            with open(path, 'rb') as f:
+                _write_compressed(built_path, f.read())
+        manifest[name] = built_name
+
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    legacy = os.path.join(build_folder, LEGACY_MANIFEST)
+    if os.path.exists(legacy):
+        os.remove(legacy)
+    _manifest = manifest
+    return manifest
+
+
+def load_manifest(manifest_path=MANIFEST_PATH):
+    global _manifest
+    try:
+        with open(manifest_path) as f:
+            _manifest = json.load(f)
+    except FileNotFoundError:
+        _manifest = {}
+    return _manifest
+
+
+def asset_url(filename, **values):
+    """url_for('static', filename=...) for an asset, fingerprinted once built."""
+    built = _manifest.get(filename)
+    if built is None:
+        return url_for('static', filename=filename, **values)
+    return url_for('asset', filename=built, **values)
+
+
+def send_asset(filename):
+    # Precompressed copy if there is one the client accepts (q > 0, so
+    # "br;q=0" is a refusal); the type is still that of the original file
+    mimetype = None
+    encoding = None
+    served = filename
+    for name, suffix in ENCODINGS:
+        if request.accept_encodings[name] > 0 and os.path.isfile(os.path.join(BUILD_FOLDER, filename + suffix)):
+            mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+            encoding = name
+            served = filename + suffix
+            break
+
+    response = send_from_directory(BUILD_FOLDER, served, mimetype=mimetype, max_age=ASSET_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if os.path.splitext(filename)[1].lower() in COMPRESSIBLE:
+        response.vary.add('Accept-Encoding')
+    return response
+
+
+def init_app(app):
+    load_manifest()
+    app.add_url_rule('/static/dist/<path:filename>', 'asset', send_asset)
+    app.jinja_env.globals['asset_url'] = asset_url
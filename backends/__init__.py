@@ -0,0 +1,23 @@
+"""Storage backends behind db.py, chosen with the DB_BACKEND setting.
+
+supabase (default) talks to the hosted Postgres through PostgREST, sqlite
+stores the same tables in a local WAL-mode file (SQLITE_PATH) and memory
+keeps everything in process. All three implement backends.base.StorageBackend.
+"""
+import os
+
+
+def create_backend(name=None):
+    name = (name or os.environ.get("DB_BACKEND") or "supabase").lower()
+
+    if name == 'supabase':
+        from backends.supabase_backend import SupabaseBackend
+        return SupabaseBackend(os.environ.get("SUPABASE_URL"), os.environ.get("SUPABASE_KEY"))
+    if name == 'sqlite':
+        from backends.sqlite_backend import SQLiteBackend
+        return SQLiteBackend(os.environ.get("SQLITE_PATH", "generalink.db"))
+    if name == 'memory':
+        from backends.memory_backend import MemoryBackend
+        return MemoryBackend()
+
+    raise ValueError(f"Unknown DB_BACKEND '{name}' (expected supabase, sqlite or memory)")
@@ -0,0 +1,174 @@
+class StorageBackend:
+    """Storage operations db.py is built on.
+
+    Rows are plain dicts keyed by the column names in supabase_schema.sql,
+    with users' profile_data already decoded to a dict. Paging helpers return
+    at most `limit` rows; callers ask for one extra row to detect more pages.
+    """
+
+    name = 'base'
+
+    def ping(self):
+        """Raise if the backend cannot be reached."""
+        raise NotImplementedError
+
+    def close(self):
+        """Release connections held by the backend."""
+
+    # --- kv_store ---
+
+    def kv_get(self, key):
+        """Return the raw (JSON text) value for `key`, or None."""
+        raise NotImplementedError
+
+    def kv_set(self, key, value):
+        raise NotImplementedError
+
+    def kv_delete(self, key):
+        raise NotImplementedError
+
+    def kv_keys(self, prefix):
+        """Return every key starting with `prefix`."""
+        raise NotImplementedError
+
+    # --- users ---
+
+    def has_users(self):
+        raise NotImplementedError
+
+    def insert_user(self, row):
+        """Insert a new user; raise if the id or email already exists."""
+        raise NotImplementedError
+
+    def upsert_users(self, rows):
+        raise NotImplementedError
+
+    def get_user_by_email(self, email):
+        """Return the full user row (including the password hash), or None."""
+        raise NotImplementedError
+
+    def get_profiles(self, ids):
+        """Return [{'id', 'profile_data'}] for the given ids that exist."""
+        raise NotImplementedError
+
+    def list_users(self):
+        """Return every user row with all columns."""
+        raise NotImplementedError
+
+    def page_users(self, after=None, limit=500):
+        """Full user rows ordered by id, starting after the id `after`."""
+        raise NotImplementedError
+
+    def merge_profile(self, user_id, patch):
+        """Atomically apply profile_data.update(patch); return the merged profile or None."""
+        raise NotImplementedError
+
+    def merge_profiles(self, patches):
+        """Apply {user_id: patch} atomically; return {user_id: merged profile}."""
+        raise NotImplementedError
+
+    def potential_matches(self, user_id, limit=None, offset=0):
+        """Users outside `user_id`'s age group it has not matched yet, ordered by id,
+        as [{'id', 'profile_data'}]."""
+        raise NotImplementedError
+
+    # --- matches ---
+
+    def save_match(self, user_id, match_id, timestamp):
+        raise NotImplementedError
+
+    def remove_match(self, user_id, match_id):
+        raise NotImplementedError
+
+    def match_ids(self, user_id):
+        """Ids matched with `user_id` in either direction, as a set."""
+        raise NotImplementedError
+
+    def upsert_matches(self, rows):
+        raise NotImplementedError
+
+    def page_matches(self, after=None, limit=500):
+        """Match rows ordered by (user_id, match_id), starting after that key."""
+        raise NotImplementedError
+
+    # --- messages ---
+
+    def insert_message(self, row):
+        """Append a message and return it with its new monotonic id."""
+        raise NotImplementedError
+
+    def list_messages(self, conversation_id, before=None, after=None, limit=50):
+        """With `after`: the oldest `limit` messages with id > after, ascending.
+        Otherwise: the newest `limit` messages (with id < before), descending."""
+        raise NotImplementedError
+
+    def upsert_legacy_messages(self, rows):
+        """Insert migrated rows, skipping (conversation_id, legacy_seq) already present."""
+        raise NotImplementedError
+
+    # --- conversation members ---
+
+    def join_conversation(self, conversation_id, user_id):
+        """Make `user_id` a member (unread 0) unless it already is."""
+        raise NotImplementedError
+
+    def record_message(self, conversation_id, sender_id, message_id, timestamp, participant_ids=()):
+        """Make the sender and `participant_ids` members, then add one to every
+        other member's unread count."""
+        raise NotImplementedError
+
+    def mark_conversation_read(self, conversation_id, user_id):
+        """Zero the member's unread count (joining if needed); return its row."""
+        raise NotImplementedError
+
+    def list_conversations(self, user_id):
+        """The user's conversation_members rows, most recent message first."""
+        raise NotImplementedError
+
+    # --- stories ---
+
+    def insert_story(self, row):
+        raise NotImplementedError
+
+    def upsert_stories(self, rows):
+        raise NotImplementedError
+
+    def page_stories(self, after=None, limit=500):
+        """Story rows (without 'author_profile') ordered by id, starting after `after`."""
+        raise NotImplementedError
+
+    def get_story(self, story_id):
+        """Return the story row plus an 'author_profile' dict, or None."""
+        raise NotImplementedError
+
+    def list_stories(self, limit, before=None):
+        """Newest-first stories (with 'author_profile') strictly older than the
+        (timestamp, id) key `before`, if given."""
+        raise NotImplementedError
+
+    def increment_likes(self, counts):
+        """Atomically add {story_id: amount} to the stories' like counts."""
+        raise NotImplementedError
+
+    # --- reports ---
+
+    def insert_report(self, row):
+        """Insert a report, update the status/reason counts and return it with its id."""
+        raise NotImplementedError
+
+    def list_reports(self, status=None, reason=None, conversation_id=None,
+                     since=None, until=None, before=None, limit=50):
+        """Reports matching every given filter, newest (highest id) first."""
+        raise NotImplementedError
+
+    def report_counts(self):
+        """Return [{'status', 'reason', 'count'}]."""
+        raise NotImplementedError
+
+    def update_report_status(self, report_id, status):
+        """Return the updated report row, or None if it does not exist."""
+        raise NotImplementedError
+
+    def upsert_legacy_reports(self, rows):
+        """Insert migrated rows, skipping (conversation_id, legacy_seq) already present."""
+        raise NotImplementedError
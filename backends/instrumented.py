@@ -0,0 +1,81 @@
+import time
+
+import metrics
+
+# StorageBackend method -> (table, operation) it maps to on Supabase
+CALL_LABELS = {
+    'ping': ('users', 'select'),
+    'kv_get': ('kv_store', 'select'),
+    'kv_set': ('kv_store', 'upsert'),
+    'kv_delete': ('kv_store', 'delete'),
+    'kv_keys': ('kv_store', 'select'),
+    'has_users': ('users', 'select'),
+    'insert_user': ('users', 'insert'),
+    'upsert_users': ('users', 'upsert'),
+    'get_user_by_email': ('users', 'select'),
+    'get_profiles': ('users', 'select'),
+    'list_users': ('users', 'select'),
+    'page_users': ('users', 'select'),
+    'merge_profile': ('users', 'rpc'),
+    'merge_profiles': ('users', 'rpc'),
+    'potential_matches': ('users', 'rpc'),
+    'save_match': ('matches', 'upsert'),
+    'remove_match': ('matches', 'delete'),
+    'match_ids': ('matches', 'select'),
+    'upsert_matches': ('matches', 'upsert'),
+    'page_matches': ('matches', 'select'),
+    'insert_message': ('messages', 'insert'),
+    'list_messages': ('messages', 'select'),
+    'upsert_legacy_messages': ('messages', 'upsert'),
+    'join_conversation': ('conversation_members', 'upsert'),
+    'record_message': ('conversation_members', 'rpc'),
+    'mark_conversation_read': ('conversation_members', 'rpc'),
+    'list_conversations': ('conversation_members', 'select'),
+    'insert_story': ('stories', 'insert'),
+    'upsert_stories': ('stories', 'upsert'),
+    'get_story': ('stories', 'select'),
+    'list_stories': ('stories', 'select'),
+    'page_stories': ('stories', 'select'),
+    'increment_likes': ('stories', 'rpc'),
+    'insert_report': ('reports', 'insert'),
+    'list_reports': ('reports', 'select'),
+    'report_counts': ('report_counts', 'select'),
+    'update_report_status': ('reports', 'update'),
+    'upsert_legacy_reports': ('reports', 'upsert'),
+}
+
+
+class InstrumentedBackend:
+    """Wraps a StorageBackend so every call is timed into metrics.record_db_call.
+
+    Anything that is not a StorageBackend method (the wrapped backend's own
+    helpers and attributes) passes straight through.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.name = backend.name
+
+    def __getattr__(self, attr):
+        value = getattr(self.backend, attr)
+        if attr not in CALL_LABELS:
+            return value
+
+        table, operation = CALL_LABELS[attr]
+        backend_name = self.name
+
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            error = False
+            try:
+                return value(*args, **kwargs)
+            except Exception:
+                error = True
+                raise
+            finally:
+                metrics.record_db_call(backend_name, attr, table, operation,
+                                       time.perf_counter() - started, error)
+
+        # Cache on the instance so later lookups skip __getattr__
+        setattr(self, attr, timed)
+        return timed
@@ -0,0 +1,360 @@
+import bisect
+import copy
+import itertools
+import threading
+from collections import defaultdict
+from datetime import datetime
+
+from backends.base import StorageBackend
+
+
+class MemoryBackend(StorageBackend):
+    """Pure in-process backend: plain dicts behind one lock.
+
+    Nothing is persisted. Used for tests and as the zero-I/O baseline when
+    benchmarking the other backends through the same db.py call paths.
+    """
+
+    name = 'memory'
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.kv = {}
+        self.users = {}                     # id -> row
+        self.emails = {}                    # email -> id
+        self.matches = {}                   # (user_id, match_id) -> timestamp
+        self.matched_by = defaultdict(set)  # match_id -> user ids
+        self.matching = defaultdict(set)    # user_id -> match ids
+        self.stories = {}                   # id -> row
+        self.story_keys = []                # sorted (timestamp, id)
+        self.messages = defaultdict(list)   # conversation id -> rows, ascending id
+        self.message_ids = defaultdict(list)  # conversation id -> ids, for bisect
+        self.legacy_messages = set()
+        self.reports = {}                   # id -> row
+        self.legacy_reports = set()
+        self.counts = defaultdict(int)      # (status, reason) -> count
+        self.members = {}                   # (conversation id, user id) -> row
+        self.member_ids = defaultdict(set)  # conversation id -> user ids
+        self.conversation_ids = defaultdict(set)  # user id -> conversation ids
+        self._ids = itertools.count(1)
+
+    def ping(self):
+        pass
+
+    # --- kv_store ---
+
+    def kv_get(self, key):
+        return self.kv.get(key)
+
+    def kv_set(self, key, value):
+        self.kv[key] = value
+
+    def kv_delete(self, key):
+        self.kv.pop(key, None)
+
+    def kv_keys(self, prefix):
+        with self._lock:
+            return [key for key in self.kv if key.startswith(prefix)]
+
+    # --- users ---
+
+    def has_users(self):
+        return bool(self.users)
+
+    def _put_user(self, row):
+        row = copy.deepcopy(row)
+        row.setdefault('profile_data', {})
+        row.setdefault('created_at', datetime.now().isoformat())
+        old = self.users.get(row['id'])
+        if old:
+            self.emails.pop(old['email'], None)
+        self.users[row['id']] = row
+        self.emails[row['email']] = row['id']
+
+    def insert_user(self, row):
+        with self._lock:
+            if row['id'] in self.users or row['email'] in self.emails:
+                raise ValueError('duplicate key value violates unique constraint')
+            self._put_user(row)
+
+    def upsert_users(self, rows):
+        with self._lock:
+            for row in rows:
+                self._put_user(row)
+
+    def get_user_by_email(self, email):
+        with self._lock:
+            user_id = self.emails.get(email)
+            return copy.deepcopy(self.users[user_id]) if user_id else None
+
+    def get_profiles(self, ids):
+        with self._lock:
+            return [
+                {'id': user_id, 'profile_data': copy.deepcopy(self.users[user_id]['profile_data'])}
+                for user_id in ids if user_id in self.users
+            ]
+
+    def list_users(self):
+        with self._lock:
+            return copy.deepcopy(list(self.users.values()))
+
+    def page_users(self, after=None, limit=500):
+        with self._lock:
+            ids = sorted(self.users)
+            start = bisect.bisect_right(ids, after) if after is not None else 0
+            return [copy.deepcopy(self.users[user_id]) for user_id in ids[start:start + limit]]
+
+    def merge_profile(self, user_id, patch):
+        with self._lock:
+            user = self.users.get(user_id)
+            if user is None:
+                return None
+            user['profile_data'].update(copy.deepcopy(patch))
+            return copy.deepcopy(user['profile_data'])
+
+    def merge_profiles(self, patches):
+        with self._lock:
+            merged = {}
+            for user_id, patch in patches.items():
+                profile = self.merge_profile(user_id, patch)
+                if profile is not None:
+                    merged[user_id] = profile
+            return merged
+
+    def potential_matches(self, user_id, limit=None, offset=0):
+        with self._lock:
+            user = self.users.get(user_id)
+            if user is None:
+                return []
+            age_group = user['profile_data'].get('ageGroup') or ''
+            excluded = self.matching[user_id] | {user_id}
+            ids = [
+                uid for uid in sorted(self.users)
+                if uid not in excluded and self.users[uid]['profile_data'].get('ageGroup') != age_group
+            ]
+            ids = ids[offset or 0:]
+            if limit is not None:
+                ids = ids[:limit]
+            return [{'id': uid, 'profile_data': copy.deepcopy(self.users[uid]['profile_data'])} for uid in ids]
+
+    # --- matches ---
+
+    def save_match(self, user_id, match_id, timestamp):
+        with self._lock:
+            self.matches[(user_id, match_id)] = timestamp
+            self.matching[user_id].add(match_id)
+            self.matched_by[match_id].add(user_id)
+
+    def remove_match(self, user_id, match_id):
+        with self._lock:
+            self.matches.pop((user_id, match_id), None)
+            self.matching[user_id].discard(match_id)
+            self.matched_by[match_id].discard(user_id)
+
+    def match_ids(self, user_id):
+        with self._lock:
+            return self.matching[user_id] | self.matched_by[user_id]
+
+    def upsert_matches(self, rows):
+        with self._lock:
+            for row in rows:
+                self.save_match(row['user_id'], row['match_id'],
+                                row.get('timestamp') or datetime.now().isoformat())
+
+    def page_matches(self, after=None, limit=500):
+        with self._lock:
+            keys = sorted(self.matches)
+            start = bisect.bisect_right(keys, tuple(after)) if after else 0
+            return [{'user_id': user_id, 'match_id': match_id, 'timestamp': self.matches[(user_id, match_id)]}
+                    for user_id, match_id in keys[start:start + limit]]
+
+    # --- messages ---
+
+    def _append_message(self, row):
+        row = dict(row, id=next(self._ids))
+        self.messages[row['conversation_id']].append(row)
+        self.message_ids[row['conversation_id']].append(row['id'])
+        return row
+
+    def insert_message(self, row):
+        with self._lock:
+            return dict(self._append_message(row))
+
+    def list_messages(self, conversation_id, before=None, after=None, limit=50):
+        with self._lock:
+            rows = self.messages.get(conversation_id, [])
+            ids = self.message_ids.get(conversation_id, [])
+            if after is not None:
+                start = bisect.bisect_right(ids, after)
+                page = rows[start:start + limit]
+            else:
+                end = bisect.bisect_left(ids, before) if before is not None else len(rows)
+                page = rows[max(0, end - limit):end][::-1]
+            return [dict(row) for row in page]
+
+    def upsert_legacy_messages(self, rows):
+        with self._lock:
+            for row in rows:
+                key = (row['conversation_id'], row['legacy_seq'])
+                if key not in self.legacy_messages:
+                    self.legacy_messages.add(key)
+                    self._append_message(row)
+
+    # --- conversation members ---
+
+    def _member(self, conversation_id, user_id):
+        row = self.members.get((conversation_id, user_id))
+        if row is None:
+            row = self.members[(conversation_id, user_id)] = {
+                'conversation_id': conversation_id, 'user_id': user_id, 'unread': 0,
+                'last_read_id': None, 'last_message_id': None, 'last_message_at': None,
+                'joined_at': datetime.now().isoformat()
+            }
+            self.member_ids[conversation_id].add(user_id)
+            self.conversation_ids[user_id].add(conversation_id)
+        return row
+
+    def join_conversation(self, conversation_id, user_id):
+        with self._lock:
+            self._member(conversation_id, user_id)
+
+    def record_message(self, conversation_id, sender_id, message_id, timestamp, participant_ids=()):
+        with self._lock:
+            for user_id in [sender_id, *participant_ids]:
+                if user_id is not None:
+                    self._member(conversation_id, user_id)
+            for user_id in self.member_ids.get(conversation_id, ()):
+                row = self.members[(conversation_id, user_id)]
+                if user_id == sender_id:
+                    row['last_read_id'] = message_id
+                else:
+                    row['unread'] += 1
+                row['last_message_id'] = message_id
+                row['last_message_at'] = timestamp
+
+    def mark_conversation_read(self, conversation_id, user_id):
+        with self._lock:
+            existed = (conversation_id, user_id) in self.members
+            row = self._member(conversation_id, user_id)
+            if existed:
+                row['unread'] = 0
+                row['last_read_id'] = row['last_message_id']
+            return dict(row)
+
+    def list_conversations(self, user_id):
+        with self._lock:
+            rows = [dict(self.members[(cid, user_id)]) for cid in self.conversation_ids.get(user_id, ())]
+        rows.sort(key=lambda row: (row['last_message_id'] is None, -(row['last_message_id'] or 0)))
+        return rows
+
+    # --- stories ---
+
+    def _put_story(self, row):
+        row = dict(row)
+        if not row.get('timestamp'):
+            row['timestamp'] = datetime.now().isoformat()
+        old = self.stories.get(row['id'])
+        if old:
+            self.story_keys.remove((old['timestamp'], old['id']))
+        self.stories[row['id']] = row
+        bisect.insort(self.story_keys, (row['timestamp'], row['id']))
+
+    def _with_author(self, row):
+        author = self.users.get(row.get('author_id'))
+        return dict(row, author_profile=copy.deepcopy(author['profile_data']) if author else {})
+
+    def insert_story(self, row):
+        with self._lock:
+            if row['id'] in self.stories:
+                raise ValueError('duplicate key value violates unique constraint')
+            self._put_story(row)
+
+    def upsert_stories(self, rows):
+        with self._lock:
+            for row in rows:
+                self._put_story(row)
+
+    def page_stories(self, after=None, limit=500):
+        with self._lock:
+            ids = sorted(self.stories)
+            start = bisect.bisect_right(ids, after) if after is not None else 0
+            return [dict(self.stories[story_id]) for story_id in ids[start:start + limit]]
+
+    def get_story(self, story_id):
+        with self._lock:
+            row = self.stories.get(story_id)
+            return self._with_author(row) if row else None
+
+    def list_stories(self, limit, before=None):
+        with self._lock:
+            end = bisect.bisect_left(self.story_keys, tuple(before)) if before else len(self.story_keys)
+            keys = self.story_keys[max(0, end - limit):end][::-1]
+            return [self._with_author(self.stories[story_id]) for _, story_id in keys]
+
+    def increment_likes(self, counts):
+        with self._lock:
+            for story_id, amount in counts.items():
+                story = self.stories.get(story_id)
+                if story:
+                    story['likes'] = (story.get('likes') or 0) + amount
+
+    # --- reports ---
+
+    def _add_report(self, row):
+        row = dict(row, id=next(self._ids))
+        row.setdefault('status', 'pending')
+        self.reports[row['id']] = row
+        self.counts[(row['status'], row.get('reason') or '')] += 1
+        return row
+
+    def insert_report(self, row):
+        with self._lock:
+            return dict(self._add_report(row))
+
+    def list_reports(self, status=None, reason=None, conversation_id=None,
+                     since=None, until=None, before=None, limit=50):
+        with self._lock:
+            page = []
+            for report_id in sorted(self.reports, reverse=True):
+                row = self.reports[report_id]
+                if before is not None and report_id >= before:
+                    continue
+                if status and row['status'] != status:
+                    continue
+                if reason and row.get('reason') != reason:
+                    continue
+                if conversation_id and row['conversation_id'] != conversation_id:
+                    continue
+                if since and row['timestamp'] < since:
+                    continue
+                if until and row['timestamp'] >= until:
+                    continue
+                page.append(dict(row))
+                if len(page) >= limit:
+                    break
+            return page
+
+    def report_counts(self):
+        with self._lock:
+            return [
+                {'status': status, 'reason': reason, 'count': count}
+                for (status, reason), count in self.counts.items()
+            ]
+
+    def update_report_status(self, report_id, status):
+        with self._lock:
+            row = self.reports.get(report_id)
+            if row is None:
+                return None
+            self.counts[(row['status'], row.get('reason') or '')] -= 1
+            row['status'] = status
+            self.counts[(status, row.get('reason') or '')] += 1
+            return dict(row)
+
+    def upsert_legacy_reports(self, rows):
+        with self._lock:
+            for row in rows:
+                key = (row['conversation_id'], row['legacy_seq'])
+                if key not in self.legacy_reports:
+                    self.legacy_reports.add(key)
+                    self._add_report(row)
@@ -0,0 +1,486 @@
+import json
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from backends.base import StorageBackend
+
+# Connections open at once. Calls beyond this wait for one to be returned.
+SQLITE_POOL_SIZE = int(os.environ.get("SQLITE_POOL_SIZE", 4))
+
+# supabase_schema.sql translated to SQLite. JSON columns are stored as text,
+# identity columns become AUTOINCREMENT and timestamps are ISO-8601 strings.
+SCHEMA = """
+create table if not exists kv_store (
+  key text primary key,
+  value text not null
+);
+
+create table if not exists users (
+  id text primary key,
+  email text unique not null,
+  password text not null,
+  phone text,
+  nric text,
+  profile_data text not null default '{}',
+  created_at text not null default (strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))
+);
+-- The age-group filter is an inequality, which no index can serve
+drop index if exists users_age_group_idx;
+
+create table if not exists matches (
+  user_id text references users(id),
+  match_id text references users(id),
+  timestamp text not null default (strftime('%Y-%m-%dT%H:%M:%fZ', 'now')),
+  primary key (user_id, match_id)
+);
+create index if not exists matches_match_id_idx on matches (match_id);
+
+create table if not exists stories (
+  id text primary key,
+  author_id text references users(id),
+  content text not null,
+  timestamp text not null default (strftime('%Y-%m-%dT%H:%M:%fZ', 'now')),
+  likes integer default 0,
+  badges text
+);
+create index if not exists stories_feed_idx on stories (timestamp desc, id desc);
+
+create table if not exists messages (
+  id integer primary key autoincrement,
+  conversation_id text not null,
+  sender_id text,
+  text text,
+  timestamp text not null default (strftime('%Y-%m-%dT%H:%M:%fZ', 'now')),
+  legacy_seq integer,
+  unique (conversation_id, legacy_seq)
+);
+create index if not exists messages_conversation_id_idx on messages (conversation_id, id);
+
+create table if not exists reports (
+  id integer primary key autoincrement,
+  conversation_id text not null,
+  reported_by text,
+  reason text,
+  details text,
+  timestamp text not null default (strftime('%Y-%m-%dT%H:%M:%fZ', 'now')),
+  status text not null default 'pending',
+  legacy_seq integer,
+  unique (conversation_id, legacy_seq)
+);
+create index if not exists reports_status_idx on reports (status, id desc);
+create index if not exists reports_reason_idx on reports (reason, id desc);
+create index if not exists reports_conversation_idx on reports (conversation_id, id desc);
+create index if not exists reports_timestamp_idx on reports (timestamp);
+
+create table if not exists conversation_members (
+  conversation_id text not null,
+  user_id text not null,
+  unread integer not null default 0,
+  last_read_id integer,
+  last_message_id integer,
+  last_message_at text,
+  joined_at text not null default (strftime('%Y-%m-%dT%H:%M:%fZ', 'now')),
+  primary key (conversation_id, user_id)
+);
+create index if not exists conversation_members_user_idx on conversation_members (user_id, last_message_id desc);
+
+create table if not exists report_counts (
+  status text not null,
+  reason text not null,
+  count integer not null default 0,
+  primary key (status, reason)
+);
+
+create trigger if not exists reports_insert_counts after insert on reports begin
+  insert into report_counts (status, reason, count) values (new.status, coalesce(new.reason, ''), 1)
+  on conflict (status, reason) do update set count = count + 1;
+end;
+
+create trigger if not exists reports_delete_counts after delete on reports begin
+  update report_counts set count = count - 1
+  where status = old.status and reason = coalesce(old.reason, '');
+end;
+
+create trigger if not exists reports_update_counts after update of status, reason on reports begin
+  update report_counts set count = count - 1
+  where status = old.status and reason = coalesce(old.reason, '');
+  insert into report_counts (status, reason, count) values (new.status, coalesce(new.reason, ''), 1)
+  on conflict (status, reason) do update set count = count + 1;
+end;
+"""
+
+USER_COLUMNS = ('id', 'email', 'password', 'phone', 'nric', 'profile_data')
+STORY_COLUMNS = ('id', 'author_id', 'content', 'timestamp', 'likes', 'badges')
+STORY_SELECT = """
+    select s.id, s.author_id, s.content, s.timestamp, s.likes, s.badges,
+           u.profile_data as author_profile
+    from stories s left join users u on u.id = s.author_id
+"""
+
+
+def _user_row(row):
+    row = dict(row)
+    row['profile_data'] = json.loads(row.get('profile_data') or '{}')
+    return row
+
+
+def _story_row(row):
+    row = dict(row)
+    row['author_profile'] = json.loads(row['author_profile'] or '{}')
+    return row
+
+
+def _user_params(row):
+    params = {column: row.get(column) for column in USER_COLUMNS}
+    params['profile_data'] = json.dumps(row.get('profile_data') or {})
+    return params
+
+
+class SQLiteBackend(StorageBackend):
+    """Local SQLite (WAL mode) implementation of supabase_schema.sql.
+
+    Every call borrows a connection from a small bounded pool and hands it
+    back when done. Threads and eventlet green threads share the pool instead
+    of each opening (and leaking) a connection of their own. Read-modify-write
+    operations run inside BEGIN IMMEDIATE so they are atomic across
+    connections, like the single-statement SQL functions on Supabase.
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, path='generalink.db', pool_size=SQLITE_POOL_SIZE):
+        self.path = path
+        self.pool_size = pool_size
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(pool_size)
+        with self.connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute('pragma journal_mode=wal')
+        conn.execute('pragma synchronous=normal')
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Borrow a pooled connection for the duration of the block."""
+        self._slots.acquire()
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            try:
+                yield conn
+            finally:
+                self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """Close pooled connections once the backend is no longer in use."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+    @contextmanager
+    def transaction(self):
+        with self.connection() as conn:
+            conn.execute('begin immediate')
+            try:
+                yield conn
+            except BaseException:
+                conn.execute('rollback')
+                raise
+            conn.execute('commit')
+
+    def execute(self, sql, params=()):
+        with self.connection() as conn:
+            conn.execute(sql, params)
+
+    def query(self, sql, params=()):
+        with self.connection() as conn:
+            return [dict(row) for row in conn.execute(sql, params)]
+
+    def ping(self):
+        self.execute('select 1')
+
+    # --- kv_store ---
+
+    def kv_get(self, key):
+        rows = self.query('select value from kv_store where key = ?', (key,))
+        return rows[0]['value'] if rows else None
+
+    def kv_set(self, key, value):
+        self.execute(
+            'insert into kv_store (key, value) values (?, ?) '
+            'on conflict (key) do update set value = excluded.value', (key, value))
+
+    def kv_delete(self, key):
+        self.execute('delete from kv_store where key = ?', (key,))
+
+    def kv_keys(self, prefix):
+        rows = self.query("select key from kv_store where substr(key, 1, ?) = ?", (len(prefix), prefix))
+        return [row['key'] for row in rows]
+
+    # --- users ---
+
+    def has_users(self):
+        return bool(self.query('select 1 from users limit 1'))
+
+    def insert_user(self, row):
+        self.execute(
+            'insert into users (id, email, password, phone, nric, profile_data) '
+            'values (:id, :email, :password, :phone, :nric, :profile_data)', _user_params(row))
+
+    def upsert_users(self, rows):
+        with self.transaction() as conn:
+            conn.executemany(
+                'insert into users (id, email, password, phone, nric, profile_data) '
+                'values (:id, :email, :password, :phone, :nric, :profile_data) '
+                'on conflict (id) do update set email = excluded.email, password = excluded.password, '
+                'phone = excluded.phone, nric = excluded.nric, profile_data = excluded.profile_data',
+                [_user_params(row) for row in rows])
+
+    def get_user_by_email(self, email):
+        rows = self.query('select * from users where email = ?', (email,))
+        return _user_row(rows[0]) if rows else None
+
+    def get_profiles(self, ids):
+        ids = list(ids)
+        if not ids:
+            return []
+        placeholders = ', '.join('?' * len(ids))
+        rows = self.query(f'select id, profile_data from users where id in ({placeholders})', ids)
+        return [_user_row(row) for row in rows]
+
+    def list_users(self):
+        return [_user_row(row) for row in self.query('select * from users')]
+
+    def page_users(self, after=None, limit=500):
+        rows = self.query('select * from users where id > ? order by id limit ?', (after or '', limit))
+        return [_user_row(row) for row in rows]
+
+    def _merge(self, conn, user_id, patch):
+        rows = conn.execute('select profile_data from users where id = ?', (user_id,)).fetchall()
+        if not rows:
+            return None
+        profile = json.loads(rows[0]['profile_data'] or '{}')
+        profile.update(patch)
+        conn.execute('update users set profile_data = ? where id = ?', (json.dumps(profile), user_id))
+        return profile
+
+    def merge_profile(self, user_id, patch):
+        with self.transaction() as conn:
+            return self._merge(conn, user_id, patch)
+
+    def merge_profiles(self, patches):
+        merged = {}
+        with self.transaction() as conn:
+            for user_id, patch in patches.items():
+                profile = self._merge(conn, user_id, patch)
+                if profile is not None:
+                    merged[user_id] = profile
+        return merged
+
+    def potential_matches(self, user_id, limit=None, offset=0):
+        rows = self.query("""
+            select u.id, u.profile_data
+            from users u
+            join (
+              select coalesce(json_extract(profile_data, '$.ageGroup'), '') as age_group
+              from users where id = :user_id
+            ) me
+            where u.id <> :user_id
+              and json_extract(u.profile_data, '$.ageGroup') is not me.age_group
+              and not exists (
+                select 1 from matches m where m.user_id = :user_id and m.match_id = u.id
+              )
+            order by u.id
+            limit :limit offset :offset
+        """, {'user_id': user_id, 'limit': -1 if limit is None else limit, 'offset': offset or 0})
+        return [_user_row(row) for row in rows]
+
+    # --- matches ---
+
+    def save_match(self, user_id, match_id, timestamp):
+        self.execute(
+            'insert into matches (user_id, match_id, timestamp) values (?, ?, ?) '
+            'on conflict (user_id, match_id) do update set timestamp = excluded.timestamp',
+            (user_id, match_id, timestamp))
+
+    def remove_match(self, user_id, match_id):
+        self.execute(
+            'delete from matches where user_id = ? and match_id = ?', (user_id, match_id))
+
+    def match_ids(self, user_id):
+        rows = self.query(
+            'select match_id as id from matches where user_id = ? '
+            'union select user_id from matches where match_id = ?', (user_id, user_id))
+        return {row['id'] for row in rows}
+
+    def upsert_matches(self, rows):
+        with self.transaction() as conn:
+            conn.executemany(
+                'insert into matches (user_id, match_id, timestamp) '
+                "values (:user_id, :match_id, coalesce(:timestamp, strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))) "
+                'on conflict (user_id, match_id) do update set timestamp = excluded.timestamp',
+                [{column: row.get(column) for column in ('user_id', 'match_id', 'timestamp')} for row in rows])
+
+    def page_matches(self, after=None, limit=500):
+        sql, params = 'select user_id, match_id, timestamp from matches', []
+        if after:
+            sql += ' where (user_id, match_id) > (?, ?)'
+            params.extend(after)
+        return self.query(sql + ' order by user_id, match_id limit ?', params + [limit])
+
+    # --- messages ---
+
+    def insert_message(self, row):
+        rows = self.query(
+            'insert into messages (conversation_id, sender_id, text, timestamp) '
+            'values (:conversation_id, :sender_id, :text, :timestamp) '
+            'returning id, conversation_id, sender_id, text, timestamp', row)
+        return rows[0]
+
+    def list_messages(self, conversation_id, before=None, after=None, limit=50):
+        sql = 'select id, sender_id, text, timestamp from messages where conversation_id = ?'
+        params = [conversation_id]
+        if after is not None:
+            sql += ' and id > ? order by id'
+            params.append(after)
+        else:
+            if before is not None:
+                sql += ' and id < ?'
+                params.append(before)
+            sql += ' order by id desc'
+        return self.query(sql + ' limit ?', params + [limit])
+
+    def upsert_legacy_messages(self, rows):
+        with self.transaction() as conn:
+            conn.executemany(
+                'insert into messages (conversation_id, sender_id, text, timestamp, legacy_seq) '
+                'values (:conversation_id, :sender_id, :text, :timestamp, :legacy_seq) '
+                'on conflict (conversation_id, legacy_seq) do nothing', rows)
+
+    # --- conversation members ---
+
+    def join_conversation(self, conversation_id, user_id):
+        self.execute(
+            'insert into conversation_members (conversation_id, user_id) values (?, ?) '
+            'on conflict (conversation_id, user_id) do nothing', (conversation_id, user_id))
+
+    def record_message(self, conversation_id, sender_id, message_id, timestamp, participant_ids=()):
+        members = [(conversation_id, user_id) for user_id in [sender_id, *participant_ids] if user_id is not None]
+        with self.transaction() as conn:
+            conn.executemany(
+                'insert into conversation_members (conversation_id, user_id) values (?, ?) '
+                'on conflict (conversation_id, user_id) do nothing', members)
+            conn.execute("""
+                update conversation_members
+                set unread = unread + case when user_id = :sender_id then 0 else 1 end,
+                    last_read_id = case when user_id = :sender_id then :message_id else last_read_id end,
+                    last_message_id = :message_id,
+                    last_message_at = :timestamp
+                where conversation_id = :conversation_id
+            """, {'conversation_id': conversation_id, 'sender_id': sender_id,
+                  'message_id': message_id, 'timestamp': timestamp})
+
+    def mark_conversation_read(self, conversation_id, user_id):
+        rows = self.query(
+            'insert into conversation_members (conversation_id, user_id) values (?, ?) '
+            'on conflict (conversation_id, user_id) do update set unread = 0, last_read_id = last_message_id '
+            'returning *', (conversation_id, user_id))
+        return rows[0] if rows else None
+
+    def list_conversations(self, user_id):
+        return self.query(
+            'select * from conversation_members where user_id = ? '
+            'order by last_message_id is null, last_message_id desc', (user_id,))
+
+    # --- stories ---
+
+    def insert_story(self, row):
+        self.execute(
+            'insert into stories (id, author_id, content, timestamp, likes, badges) '
+            'values (:id, :author_id, :content, :timestamp, :likes, :badges)',
+            {column: row.get(column) for column in STORY_COLUMNS})
+
+    def upsert_stories(self, rows):
+        with self.transaction() as conn:
+            conn.executemany(
+                'insert into stories (id, author_id, content, timestamp, likes, badges) '
+                "values (:id, :author_id, :content, coalesce(:timestamp, strftime('%Y-%m-%dT%H:%M:%fZ', 'now')), "
+                ':likes, :badges) '
+                'on conflict (id) do update set author_id = excluded.author_id, content = excluded.content, '
+                'timestamp = excluded.timestamp, likes = excluded.likes, badges = excluded.badges',
+                [{column: row.get(column) for column in STORY_COLUMNS} for row in rows])
+
+    def page_stories(self, after=None, limit=500):
+        return self.query(
+            f'select {", ".join(STORY_COLUMNS)} from stories where id > ? order by id limit ?',
+            (after or '', limit))
+
+    def get_story(self, story_id):
+        rows = self.query(STORY_SELECT + ' where s.id = ?', (story_id,))
+        return _story_row(rows[0]) if rows else None
+
+    def list_stories(self, limit, before=None):
+        sql, params = STORY_SELECT, []
+        if before:
+            sql += ' where (s.timestamp, s.id) < (?, ?)'
+            params.extend(before)
+        sql += ' order by s.timestamp desc, s.id desc limit ?'
+        return [_story_row(row) for row in self.query(sql, params + [limit])]
+
+    def increment_likes(self, counts):
+        with self.transaction() as conn:
+            conn.executemany(
+                'update stories set likes = coalesce(likes, 0) + ? where id = ?',
+                [(amount, story_id) for story_id, amount in counts.items()])
+
+    # --- reports ---
+
+    def insert_report(self, row):
+        # report_counts is maintained by triggers, as on Supabase
+        rows = self.query(
+            'insert into reports (conversation_id, reported_by, reason, details, timestamp, status) '
+            'values (:conversation_id, :reported_by, :reason, :details, :timestamp, :status) '
+            'returning *', row)
+        return rows[0]
+
+    def list_reports(self, status=None, reason=None, conversation_id=None,
+                     since=None, until=None, before=None, limit=50):
+        filters = [
+            ('status = ?', status),
+            ('reason = ?', reason),
+            ('conversation_id = ?', conversation_id),
+            ('timestamp >= ?', since),
+            ('timestamp < ?', until),
+            ('id < ?', before)
+        ]
+        clauses = [clause for clause, value in filters if value is not None and value != '']
+        params = [value for _, value in filters if value is not None and value != '']
+        where = f" where {' and '.join(clauses)}" if clauses else ''
+        return self.query(f'select * from reports{where} order by id desc limit ?', params + [limit])
+
+    def report_counts(self):
+        return self.query('select status, reason, count from report_counts')
+
+    def update_report_status(self, report_id, status):
+        rows = self.query('update reports set status = ? where id = ? returning *', (status, report_id))
+        return rows[0] if rows else None
+
+    def upsert_legacy_reports(self, rows):
+        with self.transaction() as conn:
+            conn.executemany(
+                'insert into reports (conversation_id, reported_by, reason, details, timestamp, status, legacy_seq) '
+                'values (:conversation_id, :reported_by, :reason, :details, :timestamp, :status, :legacy_seq) '
+                'on conflict (conversation_id, legacy_seq) do nothing', rows)
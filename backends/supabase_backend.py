@@ -0,0 +1,260 @@
+import json
+
+from backends.base import StorageBackend
+from db_pool import create_supabase_client, parallel
+
+STORY_COLUMNS = 'id, author_id, content, timestamp, likes, badges, users!stories_author_id_fkey(profile_data)'
+
+
+def _decode(value):
+    if isinstance(value, str):
+        return json.loads(value)
+    return value or {}
+
+
+def _user_row(row):
+    row['profile_data'] = _decode(row.get('profile_data'))
+    return row
+
+
+def _quote(value):
+    """Double-quote a value for a PostgREST logic filter (or=/and=), so commas,
+    dots and parentheses in it cannot change the filter's structure."""
+    if not isinstance(value, str):
+        raise ValueError(f"Expected a string filter value, got {type(value).__name__}")
+    return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def _story_row(row):
+    author = row.pop('users', None) or {}
+    row['author_profile'] = _decode(author.get('profile_data'))
+    return row
+
+
+class SupabaseBackend(StorageBackend):
+    """The production backend: PostgREST over the pooled client in db_pool."""
+
+    name = 'supabase'
+
+    def __init__(self, url, key):
+        self.client = create_supabase_client(url, key)
+
+    def table(self, name):
+        return self.client.table(name)
+
+    def rpc(self, name, params):
+        return self.client.rpc(name, params).execute()
+
+    def ping(self):
+        self.table('users').select('id').limit(1).execute()
+
+    # --- kv_store ---
+
+    def kv_get(self, key):
+        response = self.table('kv_store').select('value').eq('key', key).execute()
+        return response.data[0]['value'] if response.data else None
+
+    def kv_set(self, key, value):
+        self.table('kv_store').upsert({'key': key, 'value': value}).execute()
+
+    def kv_delete(self, key):
+        self.table('kv_store').delete().eq('key', key).execute()
+
+    def kv_keys(self, prefix):
+        response = self.table('kv_store').select('key').like('key', f'{prefix}%').execute()
+        return [row['key'] for row in response.data]
+
+    # --- users ---
+
+    def has_users(self):
+        return bool(self.table('users').select('id').limit(1).execute().data)
+
+    def insert_user(self, row):
+        self.table('users').insert(row).execute()
+
+    def upsert_users(self, rows):
+        self.table('users').upsert(rows).execute()
+
+    def get_user_by_email(self, email):
+        response = self.table('users').select('*').eq('email', email).execute()
+        return _user_row(response.data[0]) if response.data else None
+
+    def get_profiles(self, ids):
+        response = self.table('users').select('id, profile_data').in_('id', list(ids)).execute()
+        return [_user_row(row) for row in response.data]
+
+    def list_users(self):
+        return [_user_row(row) for row in self.table('users').select('*').execute().data]
+
+    def page_users(self, after=None, limit=500):
+        query = self.table('users').select('*')
+        if after is not None:
+            query = query.gt('id', after)
+        return [_user_row(row) for row in query.order('id').limit(limit).execute().data]
+
+    def merge_profile(self, user_id, patch):
+        # merge_profile() in supabase_schema.sql: profile_data || patch in one UPDATE
+        profile = self.rpc('merge_profile', {'p_user_id': user_id, 'p_patch': patch}).data
+        return _decode(profile) if profile else None
+
+    def merge_profiles(self, patches):
+        response = self.rpc('merge_profiles', {'p_patches': patches})
+        return {row['id']: _decode(row.get('profile_data')) for row in response.data or []}
+
+    def potential_matches(self, user_id, limit=None, offset=0):
+        response = self.rpc('get_potential_matches', {
+            'p_user_id': user_id,
+            'p_limit': limit,
+            'p_offset': offset
+        })
+        return [_user_row(row) for row in response.data]
+
+    # --- matches ---
+
+    def save_match(self, user_id, match_id, timestamp):
+        self.table('matches').upsert({
+            'user_id': user_id,
+            'match_id': match_id,
+            'timestamp': timestamp
+        }).execute()
+
+    def remove_match(self, user_id, match_id):
+        self.table('matches').delete().eq('user_id', user_id).eq('match_id', match_id).execute()
+
+    def match_ids(self, user_id):
+        # The two directions are independent lookups, so run them together
+        initiated, received = parallel(
+            lambda: self.table('matches').select('match_id').eq('user_id', user_id).execute(),
+            lambda: self.table('matches').select('user_id').eq('match_id', user_id).execute()
+        )
+        ids = {m['match_id'] for m in initiated.data}
+        ids.update(m['user_id'] for m in received.data)
+        return ids
+
+    def upsert_matches(self, rows):
+        self.table('matches').upsert(rows).execute()
+
+    def page_matches(self, after=None, limit=500):
+        query = self.table('matches').select('user_id, match_id, timestamp')
+        if after:
+            user_id, match_id = after
+            user_id, match_id = _quote(user_id), _quote(match_id)
+            query = query.or_(f'user_id.gt.{user_id},and(user_id.eq.{user_id},match_id.gt.{match_id})')
+        return query.order('user_id').order('match_id').limit(limit).execute().data
+
+    # --- messages ---
+
+    def insert_message(self, row):
+        return self.table('messages').insert(row).execute().data[0]
+
+    def list_messages(self, conversation_id, before=None, after=None, limit=50):
+        query = self.table('messages').select('id, sender_id, text, timestamp') \
+            .eq('conversation_id', conversation_id)
+        if after is not None:
+            query = query.gt('id', after).order('id')
+        else:
+            if before is not None:
+                query = query.lt('id', before)
+            query = query.order('id', desc=True)
+        return query.limit(limit).execute().data
+
+    def upsert_legacy_messages(self, rows):
+        self.table('messages').upsert(
+            rows, on_conflict='conversation_id,legacy_seq', ignore_duplicates=True
+        ).execute()
+
+    # --- conversation members ---
+
+    def join_conversation(self, conversation_id, user_id):
+        self.table('conversation_members').upsert(
+            {'conversation_id': conversation_id, 'user_id': user_id},
+            on_conflict='conversation_id,user_id', ignore_duplicates=True
+        ).execute()
+
+    def record_message(self, conversation_id, sender_id, message_id, timestamp, participant_ids=()):
+        self.rpc('record_message', {
+            'p_conversation_id': conversation_id,
+            'p_sender_id': sender_id,
+            'p_message_id': message_id,
+            'p_timestamp': timestamp,
+            'p_participant_ids': list(participant_ids)
+        })
+
+    def mark_conversation_read(self, conversation_id, user_id):
+        response = self.rpc('mark_conversation_read', {
+            'p_conversation_id': conversation_id,
+            'p_user_id': user_id
+        })
+        return response.data[0] if response.data else None
+
+    def list_conversations(self, user_id):
+        return self.table('conversation_members').select('*').eq('user_id', user_id) \
+            .order('last_message_id', desc=True, nullsfirst=False).execute().data
+
+    # --- stories ---
+
+    def insert_story(self, row):
+        self.table('stories').insert(row).execute()
+
+    def upsert_stories(self, rows):
+        self.table('stories').upsert(rows).execute()
+
+    def page_stories(self, after=None, limit=500):
+        query = self.table('stories').select('id, author_id, content, timestamp, likes, badges')
+        if after is not None:
+            query = query.gt('id', after)
+        return query.order('id').limit(limit).execute().data
+
+    def get_story(self, story_id):
+        response = self.table('stories').select(STORY_COLUMNS).eq('id', story_id).execute()
+        return _story_row(response.data[0]) if response.data else None
+
+    def list_stories(self, limit, before=None):
+        query = self.table('stories').select(STORY_COLUMNS)
+        if before:
+            ts, story_id = (_quote(value) for value in before)
+            query = query.or_(f'timestamp.lt.{ts},and(timestamp.eq.{ts},id.lt.{story_id})')
+        response = query.order('timestamp', desc=True).order('id', desc=True).limit(limit).execute()
+        return [_story_row(row) for row in response.data]
+
+    def increment_likes(self, counts):
+        if len(counts) == 1:
+            [(story_id, amount)] = counts.items()
+            self.rpc('increment_story_likes', {'p_story_id': story_id, 'p_amount': amount})
+        else:
+            self.rpc('increment_story_likes_batch', {'p_counts': counts})
+
+    # --- reports ---
+
+    def insert_report(self, row):
+        # report_counts is maintained by a trigger on the reports table
+        return self.table('reports').insert(row).execute().data[0]
+
+    def list_reports(self, status=None, reason=None, conversation_id=None,
+                     since=None, until=None, before=None, limit=50):
+        query = self.table('reports').select('*')
+        if status:
+            query = query.eq('status', status)
+        if reason:
+            query = query.eq('reason', reason)
+        if conversation_id:
+            query = query.eq('conversation_id', conversation_id)
+        if since:
+            query = query.gte('timestamp', since)
+        if until:
+            query = query.lt('timestamp', until)
+        if before is not None:
+            query = query.lt('id', before)
+        return query.order('id', desc=True).limit(limit).execute().data
+
+    def report_counts(self):
+        return self.table('report_counts').select('status, reason, count').execute().data
+
+    def update_report_status(self, report_id, status):
+        response = self.table('reports').update({'status': status}).eq('id', report_id).execute()
+        return response.data[0] if response.data else None
+
+    def upsert_legacy_reports(self, rows):
+        self.table('reports').upsert(
+            rows, on_conflict='conversation_id,legacy_seq', ignore_duplicates=True
+        ).execute()
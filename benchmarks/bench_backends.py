@@ -0,0 +1,93 @@
+"""Run the same db.py call paths against each local storage backend.
+
+Usage: python benchmarks/bench_backends.py [users] [backend ...]
+
+Backends default to memory and sqlite (a temporary WAL-mode file). Pass
+'supabase' explicitly to include the configured Supabase project.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DB_BACKEND", "memory")
+os.environ["LIKE_FLUSH_INTERVAL_MS"] = "0"
+
+import db
+from backends import create_backend
+from backends.sqlite_backend import SQLiteBackend
+from hashing import hash_password
+
+INTERESTS = ["Cooking & Recipes", "History & Heritage", "Technology", "Music & Arts",
+             "Gardening", "Travel", "Languages", "Sports & Fitness"]
+
+
+def make_backend(name, tmpdir):
+    if name == 'sqlite':
+        return SQLiteBackend(os.path.join(tmpdir, 'bench.db'))
+    return create_backend(name)
+
+
+def populate(backend, n_users, rng):
+    password = hash_password("password")
+    users = []
+    for i in range(n_users):
+        users.append({
+            'id': f"bench-{i}", 'email': f"bench-{i}@example.com", 'password': password,
+            'phone': None, 'nric': None,
+            'profile_data': {
+                'name': f"User {i}",
+                'ageGroup': 'senior' if i % 2 else 'youth',
+                'interests': rng.sample(INTERESTS, 3)
+            }
+        })
+    for i in range(0, n_users, 500):
+        backend.upsert_users(users[i:i + 500])
+    return [u['id'] for u in users]
+
+
+def bench(label, fn, repeat):
+    start = time.perf_counter()
+    for i in range(repeat):
+        fn(i)
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<28} {repeat / elapsed:>10.0f} ops/s   {elapsed / repeat * 1e6:>9.1f} us/op")
+
+
+def run(name, n_users, tmpdir):
+    rng = random.Random(1)
+    backend = make_backend(name, tmpdir)
+    db.use_backend(backend)
+    print(f"{name} ({n_users} users)")
+    ids = populate(backend, n_users, rng)
+
+    for i in range(0, 200, 2):
+        db.save_match(ids[i], ids[i + 1])
+
+    bench("save_message", lambda i: db.save_message("bench-room", {'senderId': ids[i % 2], 'text': f"hi {i}"}), 2000)
+    bench("get_messages (latest page)", lambda i: db.get_messages("bench-room"), 500)
+    bench("get_messages (delta)", lambda i: db.get_messages("bench-room", after=1990), 500)
+    bench("update_user_profile", lambda i: db.update_user_profile(ids[i % n_users], {'bio': str(i)}), 1000)
+    bench("get_user_matches", lambda i: db.get_user_matches(ids[(i * 2) % 200]), 500)
+    bench("get_potential_matches(20)", lambda i: db.get_potential_matches(ids[i % n_users], limit=20), 200)
+    story_ids = []
+    bench("create_story", lambda i: story_ids.append(db.create_story(ids[i % n_users], f"story {i}")['id']), 300)
+    bench("like_story", lambda i: db.like_story(story_ids[i % len(story_ids)]), 1000)
+    bench("get_stories (page 2)", lambda i: db.get_stories(cursor=db.encode_story_cursor(
+        {'timestamp': '9999-12-31T23:59:59', 'id': 'z'})), 300)
+    bench("save_report", lambda i: db.save_report("bench-room", {'userId': ids[0], 'reason': 'spam'}), 500)
+    bench("get_reports(pending)", lambda i: db.get_reports(status='pending'), 300)
+
+
+def main():
+    n_users = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    names = sys.argv[2:] or ['memory', 'sqlite']
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for name in names:
+            run(name, n_users, tmpdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Compare the scalar and NumPy bitset similarity scorers.
+
+Usage: python benchmarks/bench_similarity.py [seniors] [youths]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from matching_model import calculate_similarity, batch_similarity, pairwise_similarity
+
+INTERESTS = [
+    "Cooking & Recipes", "History & Heritage", "Life Stories", "Technology",
+    "Music & Arts", "Languages", "Gardening", "Sports & Fitness", "Travel",
+    "Reading", "Photography", "Board Games", "Volunteering", "Crafts",
+    "Movies", "Dancing", "Walking", "Gaming", "Art", "Faith"
+]
+
+
+def random_cohort(n, rng):
+    return [rng.sample(INTERESTS, rng.randint(0, 6)) for _ in range(n)]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    n_seniors = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    n_youths = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    rng = random.Random(42)
+    seniors = random_cohort(n_seniors, rng)
+    youths = random_cohort(n_youths, rng)
+
+    print(f"{n_seniors} seniors x {n_youths} youths ({n_seniors * n_youths} pairs)")
+
+    # One user against the whole cohort
+    scalar_row, t_scalar = timed(lambda: [calculate_similarity(seniors[0], y) for y in youths])
+    batch_row, t_batch = timed(lambda: batch_similarity(seniors[0], youths))
+    assert scalar_row == batch_row.tolist(), "batch_similarity disagrees with calculate_similarity"
+    print(f"one-vs-cohort   scalar {t_scalar * 1000:9.2f} ms   batch {t_batch * 1000:9.2f} ms")
+
+    # All pairs
+    scalar_all, t_scalar = timed(lambda: [[calculate_similarity(s, y) for y in youths] for s in seniors])
+    batch_all, t_batch = timed(lambda: pairwise_similarity(seniors, youths))
+    assert scalar_all == batch_all.tolist(), "pairwise_similarity disagrees with calculate_similarity"
+    print(f"all-pairs       scalar {t_scalar * 1000:9.2f} ms   batch {t_batch * 1000:9.2f} ms"
+          f"   ({t_scalar / t_batch:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Fan-out latency of a room emit, with and without a Socket.IO message queue.
+
+Usage: python benchmarks/bench_socketio_fanout.py [clients] [messages] [redis-url]
+
+Runs several Socket.IO servers ("workers") in this process, with clients
+spread across them and all joined to one room. Each message is emitted from
+the first server, and the benchmark measures how long until every client's
+packet has been handed to the transport. Network writes are stubbed out, so
+the numbers isolate the routing and queue cost.
+
+- single: one server, no queue (the old -w 1 setup)
+- local:  WORKERS servers on the in-process LocalPubSubManager
+- redis:  WORKERS servers on the given Redis URL (only when one is passed)
+"""
+import os
+import statistics
+import sys
+import threading
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import socketio
+
+from socket_queue import create_client_manager
+
+WORKERS = 4
+ROOM = 'bench-room'
+
+
+class Worker:
+    def __init__(self, client_manager=None):
+        self.server = socketio.Server(async_mode='threading', client_manager=client_manager)
+        self.received = 0
+        self.done = threading.Event()
+        self.expected = 0
+        self._lock = threading.Lock()
+        self.server._send_packet = self._deliver
+        self.server._send_eio_packet = self._deliver
+        self.server.manager.initialize()
+
+    def _deliver(self, eio_sid, packet):
+        with self._lock:
+            self.received += 1
+            if self.received >= self.expected:
+                self.done.set()
+
+    def connect(self):
+        sid = self.server.manager.connect(uuid.uuid4().hex, '/')
+        self.server.manager.enter_room(sid, '/', ROOM)
+
+    def expect(self, count):
+        with self._lock:
+            self.received = 0
+            self.expected = count
+            self.done.clear()
+            if count == 0:
+                self.done.set()
+
+
+def run(name, workers, n_clients, n_messages):
+    per_worker = [0] * len(workers)
+    for i in range(n_clients):
+        workers[i % len(workers)].connect()
+        per_worker[i % len(workers)] += 1
+
+    latencies = []
+    for seq in range(n_messages):
+        for worker, count in zip(workers, per_worker):
+            worker.expect(count)
+        start = time.perf_counter()
+        workers[0].server.emit('new_message', {'seq': seq}, room=ROOM)
+        for worker in workers:
+            if not worker.done.wait(5):
+                print(f"{name}: message {seq} did not reach every client")
+        latencies.append(time.perf_counter() - start)
+
+    latencies.sort()
+    print(f"{name:<7} workers={len(workers)} clients={n_clients}  "
+          f"p50={statistics.median(latencies) * 1000:.3f} ms  "
+          f"p95={latencies[int(len(latencies) * 0.95) - 1] * 1000:.3f} ms")
+
+
+def main():
+    n_clients = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    n_messages = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    redis_url = sys.argv[3] if len(sys.argv) > 3 else None
+
+    run('single', [Worker()], n_clients, n_messages)
+
+    # A fresh channel per run so workers from other runs never see the messages
+    channel = f'bench-{uuid.uuid4().hex}'
+    run('local', [Worker(create_client_manager('local://', channel)) for _ in range(WORKERS)],
+        n_clients, n_messages)
+
+    if redis_url:
+        channel = f'bench-{uuid.uuid4().hex}'
+        run('redis', [Worker(create_client_manager(redis_url, channel)) for _ in range(WORKERS)],
+            n_clients, n_messages)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Measure how long the app takes to import and to serve its first request.
+
+Usage: python benchmarks/bench_startup.py [runs] [--json results.jsonl]
+
+Each run starts a fresh interpreter so module caches don't hide import cost.
+With --json, one line of results is appended per invocation so startup time
+can be tracked across commits.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+response = app.app.test_client().get('/api/health')
+assert response.status_code == 200, response.status_code
+served = time.perf_counter()
+print(imported - start, served - start)
+"""
+
+
+def run_once(env):
+    out = subprocess.run([sys.executable, "-c", PROBE], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True)
+    import_s, first_request_s = map(float, out.stdout.split()[-2:])
+    return import_s, first_request_s
+
+
+def main():
+    args = sys.argv[1:]
+    json_path = None
+    if "--json" in args:
+        i = args.index("--json")
+        json_path = args[i + 1]
+        del args[i:i + 2]
+    runs = int(args[0]) if args else 5
+
+    env = dict(os.environ)
+    env.setdefault("DB_BACKEND", "memory")
+
+    imports, firsts = [], []
+    for _ in range(runs):
+        import_s, first_request_s = run_once(env)
+        imports.append(import_s)
+        firsts.append(first_request_s)
+
+    result = {
+        "timestamp": time.time(),
+        "backend": env["DB_BACKEND"],
+        "runs": runs,
+        "import_ms": round(statistics.median(imports) * 1000, 1),
+        "first_request_ms": round(statistics.median(firsts) * 1000, 1),
+    }
+    print(f"backend={result['backend']} runs={runs}")
+    print(f"import app:         {result['import_ms']:.1f} ms (median)")
+    print(f"first /api/health:  {result['first_request_ms']:.1f} ms (median, from start of import)")
+
+    if json_path:
+        with open(json_path, "a") as f:
+            f.write(json.dumps(result) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Frames emitted for typing indicators: per-keystroke rebroadcast vs TypingTracker.
+
+Usage: python benchmarks/bench_typing.py [rooms] [members] [seconds]
+
+Simulates (on a virtual clock) every member of every room composing messages:
+bursts of keystrokes, mid-sentence pauses, an explicit stop from the client
+after a second of inactivity, then sending the message. Each 'user_typing'
+broadcast costs one frame per other room member.
+"""
+import heapq
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from typing_indicators import TypingTracker, TYPING_SWEEP_MS
+
+CLIENT_IDLE_STOP = 1.0  # client sends isTyping: false after this long without a key
+
+
+class Clock:
+    now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def keystroke_schedule(rng, seconds):
+    """Yield (time, action) for one user: 'key', 'stop' or 'send'."""
+    t = rng.uniform(0, 10)
+    while t < seconds:
+        for _ in range(rng.randint(1, 3)):          # sentence fragments
+            for _ in range(rng.randint(5, 40)):     # keystrokes
+                t += rng.uniform(0.08, 0.25)
+                yield t, 'key'
+            if rng.random() < 0.5:
+                # Pause long enough for the client's idle stop to fire
+                yield t + CLIENT_IDLE_STOP, 'stop'
+                t += rng.uniform(1.2, 4)
+            else:
+                t += rng.uniform(0.3, 0.9)
+        t += rng.uniform(0.2, 1)
+        yield t, 'send'
+        t += rng.uniform(3, 20)
+
+
+def simulate(rooms, members, seconds, seed=1):
+    rng = random.Random(seed)
+    clock = Clock()
+    tracker = TypingTracker(clock=clock)
+    events = []
+    for room in range(rooms):
+        for user in range(members):
+            for t, action in keystroke_schedule(rng, seconds):
+                events.append((t, action, room, user))
+    sweep = TYPING_SWEEP_MS / 1000
+    events.extend((i * sweep, 'sweep', None, None) for i in range(int(seconds / sweep) + 1))
+    heapq.heapify(events)
+
+    recipients = members - 1
+    naive = tracked = keystrokes = 0
+    while events:
+        t, action, room, user = heapq.heappop(events)
+        if t > seconds:
+            break
+        clock.now = t
+        if action == 'key':
+            keystrokes += 1
+            naive += recipients
+            if tracker.start(room, user):
+                tracked += recipients
+        elif action == 'stop':
+            if tracker.stop(room, user):
+                tracked += recipients
+        elif action == 'send':
+            if tracker.clear(room, user):
+                tracked += recipients
+        else:
+            tracked += recipients * len(tracker.expire())
+
+    return keystrokes, naive, tracked
+
+
+def main():
+    rooms = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    members = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 300
+
+    keystrokes, naive, tracked = simulate(rooms, members, seconds)
+    print(f"{rooms} rooms x {members} members, {seconds:.0f}s simulated, {keystrokes} keystrokes")
+    print(f"per-keystroke rebroadcast: {naive} frames")
+    print(f"transitions only:          {tracked} frames ({naive / max(tracked, 1):.1f}x fewer)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+"""Streaming bulk import/export of users, stories and matches.
+
+Files are JSONL (one object per line) or CSV, read and written one record at
+a time so memory stays flat however large the file is. Imports are grouped
+into BULK_BATCH_SIZE rows per multi-row upsert; plain-text passwords in a
+batch are hashed in parallel on the hashing pool. Exports page through the
+tables by primary key.
+
+User records carry the account columns (id, email, password or
+password_hash, phone, nric) plus either a `profile_data` object or the
+profile fields as top-level keys/columns. In CSV, `interests` is separated
+by ';'. Exported users keep their hash in `password_hash`, so an export can
+be imported again as-is.
+"""
+import csv
+import json
+import os
+import sys
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import islice
+
+import db
+from hashing import HASH_POOL_SIZE, hash_password
+
+BULK_BATCH_SIZE = int(os.environ.get("BULK_BATCH_SIZE", 500))
+
+KINDS = ('users', 'stories', 'matches')
+FORMATS = ('jsonl', 'csv')
+
+USER_FIELDS = ('id', 'email', 'password', 'password_hash', 'phone', 'nric', 'profile_data', 'created_at')
+# Ids for records without one are derived from the record (uuid5), so
+# importing the same file again updates those rows instead of adding new ones
+IMPORT_NAMESPACE = uuid.UUID('5b1f0c3e-2f4d-4c8a-9a57-6e0d8c1b7a42')
+
+EXPORT_COLUMNS = {
+    'users': ('id', 'email', 'password_hash', 'phone', 'nric', 'profile_data', 'created_at'),
+    'stories': ('id', 'author_id', 'content', 'timestamp', 'likes', 'badges'),
+    'matches': ('user_id', 'match_id', 'timestamp'),
+}
+
+
+def detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    if path.endswith('.csv'):
+        return 'csv'
+    return 'jsonl'
+
+
+def _open(path, mode):
+    if path == '-':
+        return sys.stdin if mode == 'r' else sys.stdout
+    return open(path, mode, newline='', encoding='utf-8')
+
+
+def read_records(path, fmt=None):
+    """Yield (line number, dict) for each record in a JSONL or CSV file ('-' is stdin)."""
+    fmt = detect_format(path, fmt)
+    f = _open(path, 'r')
+    try:
+        if fmt == 'csv':
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield reader.line_num, record
+        else:
+            for line_num, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_num, json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"Record at line {line_num}: {e}") from e
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def write_records(records, path, fmt, columns):
+    """Write dicts to a JSONL or CSV file ('-' is stdout); return how many were written."""
+    f = _open(path, 'w')
+    count = 0
+    try:
+        if fmt == 'csv':
+            writer = csv.DictWriter(f, fieldnames=columns, extrasaction='ignore')
+            writer.writeheader()
+        for record in records:
+            if fmt == 'csv':
+                writer.writerow({key: _csv_value(value) for key, value in record.items()})
+            else:
+                f.write(json.dumps({key: record.get(key) for key in columns}) + '\n')
+            count += 1
+    finally:
+        if f is sys.stdout:
+            f.flush()
+        else:
+            f.close()
+    return count
+
+
+def _csv_value(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
+
+
+def batched(iterable, size):
+    it = iter(iterable)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+# --- Record -> row conversion ---
+
+def _blank(value):
+    return value is None or value == ''
+
+
+def _profile_value(key, value):
+    """CSV cells are all strings; turn the ones the app reads as other types back."""
+    if not isinstance(value, str):
+        return value
+    if key == 'interests':
+        return [item.strip() for item in value.split(';') if item.strip()]
+    if key == 'age' and value.strip().isdigit():
+        return int(value)
+    if key == 'verified':
+        return value.strip().lower() in ('1', 'true', 'yes')
+    return value
+
+
+def _derived_id(prefix, *parts):
+    name = '\x1f'.join(parts)
+    return f"{prefix}-{uuid.uuid5(IMPORT_NAMESPACE, name).hex[:16]}"
+
+
+def user_row(record):
+    """Build a users row from an import record; the password is left for hash_rows."""
+    if _blank(record.get('email')):
+        raise ValueError("missing email")
+    if _blank(record.get('password')) and _blank(record.get('password_hash')):
+        raise ValueError("missing password or password_hash")
+
+    profile = record.get('profile_data')
+    if isinstance(profile, str):
+        profile = json.loads(profile) if profile else {}
+    profile = dict(profile or {})
+    for key, value in record.items():
+        if key not in USER_FIELDS and not _blank(value):
+            profile[key] = value
+    profile = {key: _profile_value(key, value) for key, value in profile.items()}
+
+    return {
+        'id': record.get('id') or _derived_id('user', record['email'].strip().lower()),
+        'email': record['email'],
+        'password': record.get('password_hash') or None,
+        'plain_password': None if record.get('password_hash') else record['password'],
+        'phone': record.get('phone') or None,
+        'nric': record.get('nric') or None,
+        'profile_data': profile,
+    }
+
+
+def story_row(record):
+    if _blank(record.get('author_id')) or _blank(record.get('content')):
+        raise ValueError("missing author_id or content")
+    badges = record.get('badges') or ''
+    if isinstance(badges, list):
+        badges = ','.join(badges)
+    return {
+        'id': record.get('id') or _derived_id('story', record['author_id'], record.get('timestamp') or '',
+                                              record['content']),
+        'author_id': record['author_id'],
+        'content': record['content'],
+        'timestamp': record.get('timestamp') or datetime.now().isoformat(),
+        'likes': int(record.get('likes') or 0),
+        'badges': badges,
+    }
+
+
+def match_row(record):
+    if _blank(record.get('user_id')) or _blank(record.get('match_id')):
+        raise ValueError("missing user_id or match_id")
+    return {
+        'user_id': record['user_id'],
+        'match_id': record['match_id'],
+        'timestamp': record.get('timestamp') or datetime.now().isoformat(),
+    }
+
+
+def hash_rows(rows, executor):
+    """Hash the plain-text passwords of a batch of user rows in parallel."""
+    pending = [row for row in rows if row['plain_password'] is not None]
+    for row, hashed in zip(pending, executor.map(hash_password, [row['plain_password'] for row in pending])):
+        row['password'] = hashed
+    for row in rows:
+        del row['plain_password']
+    return rows
+
+
+# --- Import / export ---
+
+def _dedupe(rows, key):
+    """Keep the last row for each key: an upsert can't touch the same row twice."""
+    return list({key(row): row for row in rows}.values())
+
+
+def _rows(records, convert):
+    for line_num, record in records:
+        try:
+            yield convert(record)
+        except (ValueError, TypeError, KeyError) as e:
+            raise ValueError(f"Record at line {line_num}: {e}") from e
+
+
+def import_records(kind, path, fmt=None, batch_size=BULK_BATCH_SIZE, progress=None):
+    """Stream `kind` records from `path` into the database; return how many were written.
+
+    Each batch is one upsert, so re-running an import after fixing a bad record
+    is safe: records without an id get one derived from their content (see
+    IMPORT_NAMESPACE). Repeats of a row within a batch are dropped, the last
+    one winning. `progress(count)` is called after every batch.
+    """
+    records = read_records(path, fmt)
+    count = 0
+
+    if kind == 'users':
+        # Enough workers to keep every hashing pool slot busy, no more
+        with ThreadPoolExecutor(max_workers=HASH_POOL_SIZE) as executor:
+            for batch in batched(_rows(records, user_row), batch_size):
+                batch = _dedupe(batch, lambda row: row['id'])
+                db.upsert_users(hash_rows(batch, executor))
+                count += len(batch)
+                if progress:
+                    progress(count)
+        return count
+
+    convert, upsert, key = {
+        'stories': (story_row, db.upsert_stories, lambda row: row['id']),
+        'matches': (match_row, db.upsert_matches, lambda row: (row['user_id'], row['match_id'])),
+    }[kind]
+    for batch in batched(_rows(records, convert), batch_size):
+        batch = _dedupe(batch, key)
+        upsert(batch)
+        count += len(batch)
+        if progress:
+            progress(count)
+    return count
+
+
+def _export_user(row):
+    row = dict(row)
+    row['password_hash'] = row.pop('password', None)
+    return row
+
+
+def export_records(kind, path, fmt=None, page_size=db.EXPORT_PAGE_SIZE):
+    """Stream every `kind` row to `path`; return how many were written."""
+    fmt = detect_format(path, fmt)
+    if kind == 'users':
+        rows = (_export_user(row) for row in db.iter_users(page_size))
+    elif kind == 'stories':
+        rows = db.iter_stories(page_size)
+    else:
+        rows = db.iter_matches(page_size)
+    return write_records(rows, path, fmt, EXPORT_COLUMNS[kind])
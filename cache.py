@@ -0,0 +1,177 @@
+"""In-process caches and the channels used to keep them in sync across workers."""
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries also expire `ttl` seconds after being set.
+
+    Safe to share between (green) threads. Keeps hit/miss/eviction counters so
+    the hit rate can be checked in production.
+    """
+
+    def __init__(self, maxsize=1024, ttl=300, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._data = OrderedDict()   # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at <= self.clock():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (self.clock() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations
+        }
+
+
+# --- Invalidation channels ---
+#
+# A channel broadcasts "key X changed" to every worker so each one can drop its
+# local copy. Both implementations expose publish(key) and
+# subscribe(callback, on_reconnect=None); on_reconnect runs when messages may
+# have been missed, so the subscriber can drop everything it holds.
+
+class LocalInvalidationChannel:
+    """In-process channel. Enough for a single worker and for tests."""
+
+    def __init__(self):
+        self.subscribers = []
+
+    def publish(self, key):
+        for callback in self.subscribers:
+            callback(key)
+
+    def subscribe(self, callback, on_reconnect=None):
+        self.subscribers.append(callback)
+
+
+class RedisInvalidationChannel:
+    """Redis pub/sub channel shared by every worker pointed at the same server.
+
+    Messages published by this process are ignored on receipt, since the
+    publisher has already updated its own cache.
+
+    One background thread holds the subscription. If the connection drops it
+    logs the error and reconnects with exponential backoff (up to
+    max_backoff seconds). Invalidations sent while it was away are lost, so
+    on_reconnect callbacks run once it is subscribed again.
+    """
+
+    def __init__(self, url, channel='generalink:cache-invalidate', max_backoff=30):
+        import redis
+
+        # Health checks make a silently dead connection fail instead of hang
+        self.client = redis.Redis.from_url(url, health_check_interval=30)
+        self.channel = channel
+        self.origin = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.max_backoff = max_backoff
+        self.connected = False
+        self.reconnects = 0
+        self.errors = 0
+        self._callbacks = []
+        self._reconnect_callbacks = []
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def publish(self, key):
+        self.client.publish(self.channel, f"{self.origin}|{key}")
+
+    def subscribe(self, callback, on_reconnect=None):
+        self._callbacks.append(callback)
+        if on_reconnect is not None:
+            self._reconnect_callbacks.append(on_reconnect)
+        with self._lock:
+            if self._thread is None:
+                # Connect from the background thread so subscribing never blocks startup
+                self._thread = threading.Thread(target=self._listen, name='cache-invalidation', daemon=True)
+                self._thread.start()
+
+    def _handle(self, message):
+        origin, _, key = message['data'].decode().partition('|')
+        if origin != self.origin:
+            for callback in self._callbacks:
+                callback(key)
+
+    def _listen(self):
+        delay = 1
+        failed = False
+        while True:
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(self.channel)
+                self.connected = True
+                delay = 1
+                if failed:
+                    self.reconnects += 1
+                    logger.warning("Cache invalidation channel %s reconnected", self.channel)
+                    for callback in self._reconnect_callbacks:
+                        callback()
+                    failed = False
+                while True:
+                    message = pubsub.get_message(timeout=1)
+                    if message is not None and message['type'] == 'message':
+                        self._handle(message)
+            except Exception:
+                failed = True
+                self.errors += 1
+                logger.exception("Cache invalidation channel %s failed, retrying in %ss", self.channel, delay)
+            finally:
+                self.connected = False
+                try:
+                    pubsub.close()
+                except Exception:
+                    pass
+            time.sleep(delay)
+            delay = min(delay * 2, self.max_backoff)
+
+    def stats(self):
+        return {'connected': int(self.connected), 'reconnects': self.reconnects, 'errors': self.errors}
@@ -1,25 +1,71 @@
 import os
+import re
 import json
+import atexit
+import logging
+import base64
+import threading
+import time
+import uuid
+from collections import defaultdict
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
-from supabase import create_client, Client
-from dotenv import load_dotenv
-
-load_dotenv()
-
-# Initialize Supabase client
-url: str = os.environ.get("SUPABASE_URL")
-key: str = os.environ.get("SUPABASE_KEY")
-supabase: Client = create_client(url, key)
+from flask import g, has_app_context
+from backends import create_backend
+from backends.instrumented import InstrumentedBackend
+from cache import TTLCache
+from hashing import hash_password, verify_password
+
+logger = logging.getLogger(__name__)
+
+# Storage backend (Supabase, SQLite or in-memory; see backends/). Created on
+# first use so importing this module does no I/O, and wrapped so every call
+# is timed into metrics.
+_backend = None
+_backend_lock = threading.Lock()
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = InstrumentedBackend(create_backend())
+                atexit.register(close_backend)
+    return _backend
+
+def close_backend():
+    """Close the backend's connections (process exit, or when it is swapped out)."""
+    if _backend is not None:
+        _backend.close()
+
+def use_backend(new_backend):
+    """Swap the storage backend, e.g. to benchmark or test against SQLite or memory."""
+    global _backend
+    close_backend()
+    _backend = InstrumentedBackend(new_backend)
+    profile_cache.clear()
+    with _story_feed_lock:
+        _story_feed.update(stories=None, has_more=False, loaded_at=0.0)
+
+# Decoded {'id', 'profile_data'} rows keyed by user id, shared by every request
+profile_cache = TTLCache(
+    maxsize=int(os.environ.get("PROFILE_CACHE_SIZE", 10000)),
+    ttl=float(os.environ.get("PROFILE_CACHE_TTL", 300))
+)
+_profile_channel = None
+# fn(user_id, merged profile) run after every profile update (see matching.py)
+_profile_listeners = []
+
+def ping():
+    """Raise if the storage backend cannot be reached (used by /api/ready)."""
+    get_backend().ping()
 
 def init_db():
     """Initialize database with seed data if empty."""
     # Check if users exist
-    response = supabase.table('users').select('id').limit(1).execute()
-    if not response.data:
+    if not get_backend().has_users():
         seed_users()
         seed_stories()
-    print("Supabase database initialized.")
+    print(f"{get_backend().name} database initialized.")
 
 def seed_stories():
     stories = [
@@ -35,14 +81,13 @@ def seed_stories():
         }
     ]
     
-    for s in stories:
-        supabase.table('stories').upsert(s).execute()
+    get_backend().upsert_stories(stories)
 
 def seed_users():
     mock_users = [
         {
             "id": "1", "email": "margaret@example.com", 
-            "password": generate_password_hash("password"), 
+            "password": hash_password("password"), 
             "phone": "11111111", "nric": "111A",
             "profile_data": {
                 "name": "Margaret Chen", "ageGroup": "senior", "age": 68,
@@ -54,7 +99,7 @@ def seed_users():
         },
         {
             "id": "2", "email": "weijie@example.com", 
-            "password": generate_password_hash("password"), 
+            "password": hash_password("password"), 
             "phone": "22222222", "nric": "222A",
             "profile_data": {
                 "name": "Wei Jie", "ageGroup": "youth", "age": 19,
@@ -66,7 +111,7 @@ def seed_users():
         },
         {
             "id": "3", "email": "tan@example.com", 
-            "password": generate_password_hash("password"), 
+            "password": hash_password("password"), 
             "phone": "33333333", "nric": "333A",
             "profile_data": {
                 "name": "Uncle Tan", "ageGroup": "senior", "age": 72,
@@ -78,83 +123,254 @@ def seed_users():
         }
     ]
 
-    for u in mock_users:
-        supabase.table('users').upsert(u).execute()
+    get_backend().upsert_users(mock_users)
 
 # Key-Value Store Functions (using kv_store table)
 
 def get_value(key):
-    response = supabase.table('kv_store').select('value').eq('key', key).execute()
-    if response.data:
-        return json.loads(response.data[0]['value'])
+    value = get_backend().kv_get(key)
+    if value is not None:
+        return json.loads(value)
     return None
 
 def set_value(key, value):
     json_val = json.dumps(value)
-    supabase.table('kv_store').upsert({'key': key, 'value': json_val}).execute()
+    get_backend().kv_set(key, json_val)
 
 def delete_value(key):
-    supabase.table('kv_store').delete().eq('key', key).execute()
+    get_backend().kv_delete(key)
 
 # Message Functions
 
-def get_messages(conversation_id):
-    key = f"messages:{conversation_id}"
-    msgs = get_value(key)
-    return msgs if isinstance(msgs, list) else []
+def _format_message(row):
+    return {
+        'id': row['id'],
+        'senderId': row.get('sender_id'),
+        'text': row.get('text'),
+        'timestamp': row.get('timestamp')
+    }
+
+MESSAGE_PAGE_SIZE = 50
+MAX_MESSAGE_PAGE_SIZE = 200
+
+def get_messages(conversation_id, before=None, after=None, limit=MESSAGE_PAGE_SIZE):
+    """Return (messages, has_more) for one page of a conversation, oldest first.
+
+    `after` returns messages newer than that id (incremental sync after a
+    reconnect), `before` returns the page just older than that id, and with
+    neither the latest page is returned. `has_more` tells the client whether
+    another page exists in the direction it is paging."""
+    limit = max(1, min(limit or MESSAGE_PAGE_SIZE, MAX_MESSAGE_PAGE_SIZE))
 
-def save_message(conversation_id, message_data):
-    messages = get_messages(conversation_id)
+    # Fetch one extra row to learn whether there is another page
+    data = get_backend().list_messages(conversation_id, before=before, after=after, limit=limit + 1)
+    rows = data[:limit]
+    has_more = len(data) > limit
+    if after is None:
+        rows.reverse()
+
+    return [_format_message(row) for row in rows], has_more
+
+def save_message(conversation_id, message_data, participant_ids=()):
+    # Single-row insert; the id comes from the table's identity column so
+    # concurrent senders never collide or overwrite each other.
+    # `participant_ids` become members too, so the first message already
+    # counts as unread for a recipient who has never opened the room.
     new_message = {
-        'id': f"msg-{int(datetime.now().timestamp() * 1000)}",
-        'senderId': message_data.get('senderId'),
+        'conversation_id': conversation_id,
+        'sender_id': message_data.get('senderId'),
         'text': message_data.get('text'),
         'timestamp': datetime.now().isoformat()
     }
-    messages.append(new_message)
-    set_value(f"messages:{conversation_id}", messages)
-    return new_message
+    row = get_backend().insert_message(new_message)
+    # Bump the other members' unread counts (see get_conversations)
+    get_backend().record_message(conversation_id, row.get('sender_id'), row['id'], row['timestamp'],
+                                 participant_ids)
+    return _format_message(row)
+
+def _format_conversation(row):
+    return {
+        'conversationId': row['conversation_id'],
+        'unread': row.get('unread') or 0,
+        'lastReadId': row.get('last_read_id'),
+        'lastMessageId': row.get('last_message_id'),
+        'lastMessageAt': row.get('last_message_at')
+    }
+
+def join_conversation(conversation_id, user_id):
+    """Record `user_id` as a member so new messages count as unread for it."""
+    get_backend().join_conversation(conversation_id, user_id)
+
+def mark_conversation_read(conversation_id, user_id):
+    row = get_backend().mark_conversation_read(conversation_id, user_id)
+    return _format_conversation(row) if row else None
+
+def get_conversations(user_id):
+    """The user's conversations with unread counts, most recent first, in one call."""
+    return [_format_conversation(row) for row in get_backend().list_conversations(user_id)]
+
+# Seconds a "legacy messages still pending" answer is trusted before kv_store
+# is checked again; once the migration has run the answer is cached for good
+MIGRATION_RECHECK_SECONDS = 30
+_messages_migrated = {'done': False, 'checked_at': 0.0}
+
+def messages_migrated():
+    """True once no legacy messages:<conversation_id> blobs are left in kv_store.
+
+    Legacy rows get their ids when they are migrated, so any message written
+    before then would sort ahead of older history. The message routes refuse
+    to read or write until this is True.
+    """
+    state = _messages_migrated
+    if state['done']:
+        return True
+    now = time.monotonic()
+    if state['checked_at'] and now - state['checked_at'] < MIGRATION_RECHECK_SECONDS:
+        return False
+    state['done'] = not get_backend().kv_keys('messages:')
+    state['checked_at'] = now
+    return state['done']
+
+def migrate_kv_messages(batch_size=500):
+    """One-shot migration of legacy messages:<conversation_id> blobs from kv_store
+    into the messages table. Safe to re-run: rows are keyed by their position in
+    the old blob, and each blob is deleted once it has been copied.
+
+    Must finish before the app takes new messages (see messages_migrated()),
+    so that legacy rows get lower ids than anything written afterwards."""
+    migrated = 0
+    for key in get_backend().kv_keys('messages:'):
+        conversation_id = key.split(':', 1)[1]
+        legacy = get_value(key)
+        if not isinstance(legacy, list):
+            legacy = []
+
+        rows = []
+        for seq, m in enumerate(legacy):
+            rows.append({
+                'conversation_id': conversation_id,
+                'sender_id': m.get('senderId'),
+                'text': m.get('text'),
+                'timestamp': m.get('timestamp') or datetime.now().isoformat(),
+                'legacy_seq': seq
+            })
+
+        for i in range(0, len(rows), batch_size):
+            get_backend().upsert_legacy_messages(rows[i:i + batch_size])
+
+        delete_value(key)
+        migrated += len(rows)
+
+    _messages_migrated['done'] = not get_backend().kv_keys('messages:')
+    return migrated
+
+# Report Functions
+
+REPORT_STATUSES = ('pending', 'reviewed', 'resolved', 'dismissed')
+REPORT_PAGE_SIZE = 50
+MAX_REPORT_PAGE_SIZE = 200
+
+def _format_report(row):
+    return {
+        'id': row['id'],
+        'conversationId': row.get('conversation_id'),
+        'reportedBy': row.get('reported_by'),
+        'reason': row.get('reason'),
+        'details': row.get('details') or "",
+        'timestamp': row.get('timestamp'),
+        'status': row.get('status')
+    }
 
 def save_report(conversation_id, report_data):
-    key = f"reports:{conversation_id}"
-    reports = get_value(key)
-    if not isinstance(reports, list):
-        reports = []
-    
     new_report = {
-        'id': f"report-{int(datetime.now().timestamp() * 1000)}",
-        'reportedBy': report_data.get('userId'),
+        'conversation_id': conversation_id,
+        'reported_by': report_data.get('userId'),
         'reason': report_data.get('reason'),
         'details': report_data.get('details', ""),
         'timestamp': datetime.now().isoformat(),
         'status': "pending"
     }
-    reports.append(new_report)
-    set_value(key, reports)
-    
-    # Store globally for admin
-    all_reports_key = "admin:all-reports"
-    all_reports = get_value(all_reports_key)
-    if not isinstance(all_reports, list):
-        all_reports = []
-    
-    report_summary = new_report.copy()
-    report_summary['conversationId'] = conversation_id
-    all_reports.append(report_summary)
-    set_value(all_reports_key, all_reports)
-    
-    return new_report
+    return _format_report(get_backend().insert_report(new_report))
+
+def get_reports(status=None, reason=None, conversation_id=None, since=None, until=None,
+                before=None, limit=REPORT_PAGE_SIZE):
+    """Return (reports, has_more), newest first, for the admin dashboard.
+
+    All filters are optional; `since`/`until` are ISO timestamps and `before`
+    is the id of the last report on the previous page.
+    """
+    limit = max(1, min(limit or REPORT_PAGE_SIZE, MAX_REPORT_PAGE_SIZE))
+
+    data = get_backend().list_reports(
+        status=status, reason=reason, conversation_id=conversation_id,
+        since=since, until=until, before=before, limit=limit + 1
+    )
+    reports = [_format_report(row) for row in data[:limit]]
+    return reports, len(data) > limit
+
+def get_report_counts():
+    """Report totals by status and by reason, from the trigger-maintained report_counts table."""
+    by_status = defaultdict(int)
+    by_reason = defaultdict(int)
+    for row in get_backend().report_counts():
+        by_status[row['status']] += row['count']
+        by_reason[row['reason']] += row['count']
+
+    return {
+        'total': sum(by_status.values()),
+        'byStatus': dict(by_status),
+        'byReason': dict(by_reason)
+    }
+
+def update_report_status(report_id, status):
+    row = get_backend().update_report_status(report_id, status)
+    return _format_report(row) if row else None
+
+def migrate_kv_reports(batch_size=500):
+    """One-shot migration of legacy reports:<conversation_id> blobs into the
+    reports table. The admin:all-reports blob only duplicated those, so it is
+    simply deleted afterwards."""
+    migrated = 0
+    for key in get_backend().kv_keys('reports:'):
+        conversation_id = key.split(':', 1)[1]
+        legacy = get_value(key)
+        if not isinstance(legacy, list):
+            legacy = []
+
+        rows = []
+        for seq, r in enumerate(legacy):
+            rows.append({
+                'conversation_id': conversation_id,
+                'reported_by': r.get('reportedBy'),
+                'reason': r.get('reason'),
+                'details': r.get('details', ""),
+                'timestamp': r.get('timestamp') or datetime.now().isoformat(),
+                'status': r.get('status') or "pending",
+                'legacy_seq': seq
+            })
+
+        for i in range(0, len(rows), batch_size):
+            get_backend().upsert_legacy_reports(rows[i:i + batch_size])
+
+        delete_value(key)
+        migrated += len(rows)
+
+    delete_value("admin:all-reports")
+    return migrated
 
 # User/Auth Functions
 
 def create_user(user_data):
-    user_id = f"user-{int(datetime.now().timestamp())}"
+    user_id = f"user-{int(datetime.now().timestamp())}-{uuid.uuid4().hex[:6]}"
+    # Outside the try: a full hash pool must surface as a retryable error,
+    # not as "user already exists"
+    password_hash = hash_password(user_data['password'])
     
     try:
         new_user = {
             'id': user_id,
             'email': user_data['email'],
-            'password': generate_password_hash(user_data['password']),
+            'password': password_hash,
             'phone': user_data['phone'],
             'nric': user_data['nric'],
             'profile_data': {
@@ -163,158 +379,286 @@ def create_user(user_data):
                 'verified': False
             }
         }
-        supabase.table('users').insert(new_user).execute()
+        get_backend().insert_user(new_user)
+        _invalidate_profile(user_id)
         return {'id': user_id, 'email': user_data['email']}
     except Exception as e:
         print(f"Error creating user: {e}")
         return None
 
 def get_user_by_email(email):
-    response = supabase.table('users').select('*').eq('email', email).execute()
-    if response.data:
-        user = response.data[0]
-        # Convert profile_data if it's a dict (Supabase returns jsonb as dict)
-        if isinstance(user.get('profile_data'), dict):
-            pass  # Already a dict, no conversion needed
-        return user
-    return None
+    # Always read credentials from the database, but use the row to warm the
+    # profile cache since a login is usually followed by profile reads
+    user = get_backend().get_user_by_email(email)
+    if user:
+        _cache_profile(user['id'], user['profile_data'])
+    return user
 
 def get_user_by_credentials(email, password):
     user = get_user_by_email(email)
-    if user and check_password_hash(user['password'], password):
+    if user and verify_password(user['password'], password):
         return user
     return None
 
 def update_user_profile(user_id, profile_updates):
-    # Get current data
-    response = supabase.table('users').select('profile_data').eq('id', user_id).execute()
-    if not response.data:
+    # Merged atomically by the backend (one statement on Supabase), so
+    # concurrent partial updates (e.g. a photo upload racing an onboarding
+    # save) cannot drop each other
+    profile = get_backend().merge_profile(user_id, profile_updates)
+    if profile is None:
         return None
-        
-    current_profile = response.data[0]['profile_data']
-    if isinstance(current_profile, str):
-        current_profile = json.loads(current_profile)
-    
-    # Update fields
-    current_profile.update(profile_updates)
-    
-    supabase.table('users').update({'profile_data': current_profile}).eq('id', user_id).execute()
-    return current_profile
+
+    _invalidate_profile(user_id)
+    _cache_profile(user_id, profile)
+    _profile_changed(user_id, profile)
+    return profile
+
+def update_user_profiles(patches):
+    """Apply {user_id: patch} for many users in one request.
+
+    Returns {user_id: merged profile} for the users that exist.
+    """
+    if not patches:
+        return {}
+    profiles = get_backend().merge_profiles(patches)
+    for user_id, profile in profiles.items():
+        _invalidate_profile(user_id)
+        _cache_profile(user_id, profile)
+        _profile_changed(user_id, profile)
+    return profiles
+
+def on_profile_change(fn):
+    """Call `fn(user_id, merged profile)` after every successful profile update."""
+    _profile_listeners.append(fn)
+    return fn
+
+def _profile_changed(user_id, profile):
+    # The update is already saved; a failing listener must not turn it into an error
+    for fn in _profile_listeners:
+        try:
+            fn(user_id, profile)
+        except Exception:
+            logger.exception("Error in profile change listener %r", fn)
 
 def get_user_by_id(user_id):
-    response = supabase.table('users').select('*').eq('id', user_id).execute()
-    return response.data[0] if response.data else None
+    """Return {'id', 'profile_data'} for a user, served from cache when possible."""
+    return get_users_by_ids([user_id]).get(user_id)
+
+# --- Profile cache ---
+
+def set_profile_invalidation_channel(channel):
+    """Share profile invalidations with other workers through `channel`
+    (see cache.LocalInvalidationChannel / cache.RedisInvalidationChannel)."""
+    global _profile_channel
+    _profile_channel = channel
+    # Invalidations missed while a channel was disconnected can't be replayed
+    channel.subscribe(profile_cache.invalidate, on_reconnect=profile_cache.clear)
+
+def _cache_profile(user_id, profile):
+    row = {'id': user_id, 'profile_data': profile}
+    profile_cache.set(user_id, row)
+    cache = _request_user_cache()
+    if cache is not None:
+        cache[user_id] = row
+
+def _invalidate_profile(user_id):
+    profile_cache.invalidate(user_id)
+    _forget_user(user_id)
+    if _profile_channel is not None:
+        _profile_channel.publish(user_id)
+
+def _request_user_cache():
+    """Per-request id -> user row cache, DataLoader style. None outside a request."""
+    if not has_app_context():
+        return None
+    if 'user_cache' not in g:
+        g.user_cache = {}
+    return g.user_cache
+
+def _forget_user(user_id):
+    cache = _request_user_cache()
+    if cache is not None:
+        cache.pop(user_id, None)
+
+def get_users_by_ids(ids):
+    """Load many users with a single `in` query.
+
+    Returns {id: {'id', 'profile_data'}} for the ids that exist. Rows already
+    loaded earlier in the same request, or still in the shared profile cache,
+    are served from memory. Treat the returned rows as read-only.
+    """
+    cache = _request_user_cache()
+    users = {}
+    missing = []
+    for user_id in dict.fromkeys(ids):
+        if cache is not None and user_id in cache:
+            if cache[user_id] is not None:
+                users[user_id] = cache[user_id]
+            continue
+        row = profile_cache.get(user_id)
+        if row is not None:
+            users[user_id] = row
+            if cache is not None:
+                cache[user_id] = row
+        else:
+            missing.append(user_id)
 
-def get_potential_matches(user_id):
-    # Get current user
-    user = get_user_by_id(user_id)
-    if not user:
-        return []
-    
-    profile_data = user.get('profile_data', {})
-    if isinstance(profile_data, str):
-        profile_data = json.loads(profile_data)
-    user_age_group = profile_data.get('ageGroup', '')
-
-    # Get already matched user IDs
-    matches_response = supabase.table('matches').select('match_id').eq('user_id', user_id).execute()
-    matched_ids = [m['match_id'] for m in matches_response.data] if matches_response.data else []
-    matched_ids.append(user_id)  # Exclude self
-
-    # Get all other users
-    response = supabase.table('users').select('*').execute()
-    
+    if missing:
+        for row in get_backend().get_profiles(missing):
+            users[row['id']] = row
+            profile_cache.set(row['id'], row)
+        if cache is not None:
+            for user_id in missing:
+                cache[user_id] = users.get(user_id)
+
+    return users
+
+def get_potential_matches(user_id, limit=None, offset=0):
+    # Filtering, the already-matched anti-join, projection and paging all
+    # happen in the backend (the get_potential_matches SQL function on Supabase)
     candidates = []
-    for row in response.data:
-        if row['id'] in matched_ids:
-            continue
-        
-        p = row.get('profile_data', {})
-        if isinstance(p, str):
-            p = json.loads(p)
-        
-        # Filter by opposite age group
-        if p.get('ageGroup') != user_age_group:
-            p['id'] = row['id']
-            candidates.append(p)
-            
+    for row in get_backend().potential_matches(user_id, limit=limit, offset=offset):
+        p = row['profile_data']
+        p['id'] = row['id']
+        candidates.append(p)
+
     return candidates
 
 def save_match(user_id, match_id):
     ts = datetime.now().isoformat()
-    supabase.table('matches').upsert({
-        'user_id': user_id, 
-        'match_id': match_id, 
-        'timestamp': ts
-    }).execute()
+    get_backend().save_match(user_id, match_id, ts)
 
 def get_user_matches(user_id):
-    # Get matches where user initiated the match
-    initiated_response = supabase.table('matches').select('match_id').eq('user_id', user_id).execute()
-    
-    # Get matches where user was matched by someone else (bidirectional)
-    received_response = supabase.table('matches').select('user_id').eq('match_id', user_id).execute()
-    
-    # Combine both directions
-    match_ids = set()
-    if initiated_response.data:
-        for m in initiated_response.data:
-            match_ids.add(m['match_id'])
-    if received_response.data:
-        for m in received_response.data:
-            match_ids.add(m['user_id'])
+    # Matches the user initiated plus matches where someone else matched
+    # the user (bidirectional)
+    match_ids = get_backend().match_ids(user_id)
     
     if not match_ids:
         return []
     
-    # Get user profiles for all matches
+    # Get user profiles for all matches in one query
+    users = get_users_by_ids(match_ids)
     matches = []
     for match_id in match_ids:
-        user = get_user_by_id(match_id)
+        user = users.get(match_id)
         if user:
-            p = user.get('profile_data', {})
-            if isinstance(p, str):
-                p = json.loads(p)
+            p = dict(user['profile_data'])
             p['id'] = user['id']
             matches.append(p)
     
     return matches
 
 def remove_match(user_id, match_id):
-    supabase.table('matches').delete().eq('user_id', user_id).eq('match_id', match_id).execute()
+    get_backend().remove_match(user_id, match_id)
 
 # Story Functions
 
-def get_all_stories():
-    response = supabase.table('stories').select('*, users!stories_author_id_fkey(profile_data)').order('timestamp', desc=True).execute()
-    
-    result = []
-    for row in response.data:
-        s = dict(row)
-        
-        # Handle joined user data
-        user_data = s.pop('users', None)
-        if user_data:
-            profile = user_data.get('profile_data', {})
-            if isinstance(profile, str):
-                profile = json.loads(profile)
-            s['author_name'] = profile.get('name')
-            s['author_age_group'] = profile.get('ageGroup')
-            s['author_age'] = profile.get('age')
-        
-        # Handle badges (stored as comma-separated string)
-        badges = s.get('badges', '')
-        if isinstance(badges, str) and badges:
-            s['badges'] = badges.split(',')
-        else:
-            s['badges'] = []
-            
-        result.append(s)
-    
-    return result
+STORY_PAGE_SIZE = 20
+MAX_STORY_PAGE_SIZE = 100
+# How long the in-memory first page is trusted before it is reloaded, so
+# stories posted through other workers still show up
+STORY_FEED_TTL = float(os.environ.get("STORY_FEED_TTL", 30))
+
+# Materialised first page of the feed: newest STORY_PAGE_SIZE stories
+_story_feed = {'stories': None, 'has_more': False, 'loaded_at': 0.0}
+_story_feed_lock = threading.Lock()
+
+def _format_story(row):
+    s = dict(row)
+
+    # Handle joined author profile
+    profile = s.pop('author_profile', None)
+    if profile:
+        s['author_name'] = profile.get('name')
+        s['author_age_group'] = profile.get('ageGroup')
+        s['author_age'] = profile.get('age')
+
+    # Handle badges (stored as comma-separated string)
+    badges = s.get('badges', '')
+    if isinstance(badges, str) and badges:
+        s['badges'] = badges.split(',')
+    else:
+        s['badges'] = []
+
+    return s
+
+def encode_story_cursor(story):
+    raw = json.dumps([story['timestamp'], story['id']])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+_STORY_ID_RE = re.compile(r'^[A-Za-z0-9_.:-]{1,100}$')
+
+def decode_story_cursor(cursor):
+    """Return (timestamp, story id) from a cursor made by encode_story_cursor.
+
+    Raises ValueError for anything else: a cursor comes from the client and
+    ends up in a database filter.
+    """
+    try:
+        timestamp, story_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (TypeError, ValueError) as e:
+        # binascii.Error, JSONDecodeError and UnicodeDecodeError are ValueErrors
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(timestamp, str) or not isinstance(story_id, str) or not _STORY_ID_RE.match(story_id):
+        raise ValueError("Invalid cursor")
+    try:
+        datetime.fromisoformat(timestamp)
+    except ValueError as e:
+        raise ValueError("Invalid cursor") from e
+    return timestamp, story_id
+
+def _query_stories(limit, cursor=None):
+    """Keyset query on (timestamp, id), newest first. Returns (stories, has_more)."""
+    before = decode_story_cursor(cursor) if cursor else None
+    data = get_backend().list_stories(limit + 1, before=before)
+    stories = [_format_story(row) for row in data[:limit]]
+    return stories, len(data) > limit
+
+def _story_feed_first_page():
+    with _story_feed_lock:
+        stale = time.monotonic() - _story_feed['loaded_at'] > STORY_FEED_TTL
+        if _story_feed['stories'] is None or stale:
+            stories, has_more = _query_stories(STORY_PAGE_SIZE)
+            _story_feed.update(stories=stories, has_more=has_more, loaded_at=time.monotonic())
+        return list(_story_feed['stories']), _story_feed['has_more']
+
+def get_stories(limit=STORY_PAGE_SIZE, cursor=None):
+    """Return (stories, next_cursor) for one page of the feed, newest first.
+
+    The first page is served from memory; later pages use a keyset query
+    on (timestamp, id) starting after `cursor`.
+    """
+    limit = max(1, min(limit or STORY_PAGE_SIZE, MAX_STORY_PAGE_SIZE))
+
+    if cursor is None and limit <= STORY_PAGE_SIZE:
+        stories, has_more = _story_feed_first_page()
+        has_more = has_more or len(stories) > limit
+        stories = stories[:limit]
+    else:
+        stories, has_more = _query_stories(limit, cursor)
+
+    next_cursor = encode_story_cursor(stories[-1]) if stories and has_more else None
+    return stories, next_cursor
+
+def _feed_add_story(story):
+    with _story_feed_lock:
+        feed = _story_feed['stories']
+        if feed is None:
+            return
+        feed.insert(0, story)
+        if len(feed) > STORY_PAGE_SIZE:
+            del feed[STORY_PAGE_SIZE:]
+            _story_feed['has_more'] = True
+
+def _feed_add_likes(story_id, count):
+    with _story_feed_lock:
+        for story in _story_feed['stories'] or ():
+            if story['id'] == story_id:
+                story['likes'] = (story.get('likes') or 0) + count
+                break
 
 def create_story(author_id, content):
-    story_id = f"story-{int(datetime.now().timestamp())}"
+    story_id = f"story-{int(datetime.now().timestamp())}-{uuid.uuid4().hex[:6]}"
     timestamp = datetime.now().isoformat()
     
     new_story = {
@@ -326,53 +670,114 @@ def create_story(author_id, content):
         'badges': ''
     }
     
-    supabase.table('stories').insert(new_story).execute()
-    return get_story_by_id(story_id)
+    get_backend().insert_story(new_story)
+    story = get_story_by_id(story_id)
+    if story:
+        _feed_add_story(story)
+    return story
 
 def get_story_by_id(story_id):
-    response = supabase.table('stories').select('*, users!stories_author_id_fkey(profile_data)').eq('id', story_id).execute()
-    
-    if not response.data:
-        return None
-    
-    s = dict(response.data[0])
-    
-    user_data = s.pop('users', None)
-    if user_data:
-        profile = user_data.get('profile_data', {})
-        if isinstance(profile, str):
-            profile = json.loads(profile)
-        s['author_name'] = profile.get('name')
-        s['author_age_group'] = profile.get('ageGroup')
-        s['author_age'] = profile.get('age')
-    
-    badges = s.get('badges', '')
-    if isinstance(badges, str) and badges:
-        s['badges'] = badges.split(',')
-    else:
-        s['badges'] = []
-        
-    return s
+    row = get_backend().get_story(story_id)
+    return _format_story(row) if row else None
+
+# Likes are buffered per story and written with one batched increment every
+# LIKE_FLUSH_INTERVAL_MS, so a burst of taps costs one UPDATE. 0 disables it.
+LIKE_FLUSH_INTERVAL_MS = int(os.environ.get("LIKE_FLUSH_INTERVAL_MS", 250))
+
+_pending_likes = defaultdict(int)
+_pending_likes_lock = threading.Lock()
+_like_flusher = None
 
 def like_story(story_id):
-    # Get current likes
-    response = supabase.table('stories').select('likes').eq('id', story_id).execute()
-    if response.data:
-        current_likes = response.data[0].get('likes', 0)
-        supabase.table('stories').update({'likes': current_likes + 1}).eq('id', story_id).execute()
+    if LIKE_FLUSH_INTERVAL_MS > 0:
+        with _pending_likes_lock:
+            _pending_likes[story_id] += 1
+        _start_like_flusher()
+    else:
+        get_backend().increment_likes({story_id: 1})
+    _feed_add_likes(story_id, 1)
+
+def flush_likes():
+    """Write all buffered likes to the database in one atomic batch."""
+    with _pending_likes_lock:
+        pending = dict(_pending_likes)
+        _pending_likes.clear()
+    if not pending:
+        return
+
+    try:
+        get_backend().increment_likes(pending)
+    except Exception:
+        # Put the counts back so the next flush retries them
+        with _pending_likes_lock:
+            for story_id, count in pending.items():
+                _pending_likes[story_id] += count
+        raise
+
+def _like_flusher_loop():
+    while True:
+        time.sleep(LIKE_FLUSH_INTERVAL_MS / 1000)
+        try:
+            flush_likes()
+        except Exception as e:
+            print(f"Error flushing likes: {e}")
+
+def _start_like_flusher():
+    global _like_flusher
+    if _like_flusher is not None:
+        return
+    with _pending_likes_lock:
+        if _like_flusher is None:
+            _like_flusher = threading.Thread(target=_like_flusher_loop, daemon=True)
+            _like_flusher.start()
+            atexit.register(flush_likes)
 
 def get_all_users():
-    response = supabase.table('users').select('*').execute()
-    
     users = []
-    for row in response.data:
+    for row in get_backend().list_users():
         u = dict(row)
         p = u.get('profile_data', {})
-        if isinstance(p, str):
-            p = json.loads(p)
         u.update(p)
         del u['profile_data']
         del u['password']  # Don't send password
         users.append(u)
     
     return users
+
+# Bulk Import / Export (see bulk.py for the file formats)
+
+EXPORT_PAGE_SIZE = 500
+
+def upsert_users(rows):
+    """Insert or replace a batch of complete user rows (passwords already hashed)."""
+    get_backend().upsert_users(rows)
+    for row in rows:
+        _invalidate_profile(row['id'])
+
+def upsert_stories(rows):
+    get_backend().upsert_stories(rows)
+    with _story_feed_lock:
+        _story_feed.update(stories=None, has_more=False, loaded_at=0.0)
+
+def upsert_matches(rows):
+    get_backend().upsert_matches(rows)
+
+def _iter_pages(fetch, key, page_size):
+    after = None
+    while True:
+        rows = fetch(after, page_size)
+        yield from rows
+        if len(rows) < page_size:
+            return
+        after = key(rows[-1])
+
+def iter_users(page_size=EXPORT_PAGE_SIZE):
+    """Every user row (including the password hash), one keyset page at a time."""
+    return _iter_pages(get_backend().page_users, lambda row: row['id'], page_size)
+
+def iter_stories(page_size=EXPORT_PAGE_SIZE):
+    return _iter_pages(get_backend().page_stories, lambda row: row['id'], page_size)
+
+def iter_matches(page_size=EXPORT_PAGE_SIZE):
+    return _iter_pages(get_backend().page_matches,
+                       lambda row: (row['user_id'], row['match_id']), page_size)
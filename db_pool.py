@@ -0,0 +1,125 @@
+"""HTTP connection handling for the Supabase client.
+
+Every db.py call is an HTTP request to PostgREST. This module gives the client
+a bounded keep-alive connection pool, per-request timeouts, a cap on requests
+in flight and jittered retries for idempotent reads, and lets independent
+queries run side by side. Under eventlet the sockets are green, so waiting on
+Supabase never blocks other greenlets.
+"""
+import os
+import random
+import sys
+import threading
+import time
+
+import httpx
+
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 10))
+DB_MAX_CONCURRENCY = int(os.environ.get("DB_MAX_CONCURRENCY", DB_POOL_SIZE))
+DB_TIMEOUT = float(os.environ.get("DB_TIMEOUT", 10))
+DB_CONNECT_TIMEOUT = float(os.environ.get("DB_CONNECT_TIMEOUT", 3))
+DB_READ_RETRIES = int(os.environ.get("DB_READ_RETRIES", 2))
+DB_RETRY_BACKOFF = float(os.environ.get("DB_RETRY_BACKOFF", 0.1))
+
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+RETRY_STATUSES = {502, 503, 504}
+
+
+def backoff_delay(attempt, base=DB_RETRY_BACKOFF):
+    """Full-jitter exponential backoff, so retrying workers don't stampede."""
+    return random.uniform(0, base * (2 ** attempt))
+
+
+class _ReleasingStream(httpx.SyncByteStream):
+    """Response body that frees a concurrency slot once it has been read."""
+
+    def __init__(self, stream, release):
+        self._stream = stream
+        self._release = release
+
+    def __iter__(self):
+        yield from self._stream
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            self._release()
+
+
+class PooledTransport(httpx.HTTPTransport):
+    """httpx transport with a concurrency cap and retries for idempotent reads."""
+
+    def __init__(self, max_concurrency=DB_MAX_CONCURRENCY, retries=DB_READ_RETRIES, **kwargs):
+        super().__init__(**kwargs)
+        self.retries = retries
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+    def handle_request(self, request):
+        attempts = 1 + (self.retries if request.method in IDEMPOTENT_METHODS else 0)
+
+        for attempt in range(attempts):
+            last = attempt == attempts - 1
+            self._slots.acquire()
+            try:
+                response = super().handle_request(request)
+            except httpx.TransportError:
+                self._slots.release()
+                if last:
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUSES or last:
+                    return self._hold_slot(response)
+                response.close()
+                self._slots.release()
+            time.sleep(backoff_delay(attempt))
+
+    def _hold_slot(self, response):
+        released = []
+
+        def release():
+            if not released:
+                released.append(True)
+                self._slots.release()
+
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_ReleasingStream(response.stream, release),
+            extensions=response.extensions
+        )
+
+
+def create_http_client():
+    transport = PooledTransport(
+        limits=httpx.Limits(
+            max_connections=DB_POOL_SIZE,
+            max_keepalive_connections=DB_POOL_SIZE
+        )
+    )
+    return httpx.Client(
+        transport=transport,
+        timeout=httpx.Timeout(DB_TIMEOUT, connect=DB_CONNECT_TIMEOUT),
+        follow_redirects=True
+    )
+
+
+def create_supabase_client(url, key):
+    from supabase import create_client, ClientOptions
+
+    return create_client(url, key, options=ClientOptions(httpx_client=create_http_client()))
+
+
+def parallel(*calls):
+    """Run zero-argument callables concurrently and return their results in order."""
+    if len(calls) < 2:
+        return [call() for call in calls]
+
+    eventlet = sys.modules.get('eventlet')
+    if eventlet is not None and eventlet.patcher.is_monkey_patched('socket'):
+        pool = eventlet.GreenPool(len(calls))
+        return list(pool.imap(lambda call: call(), calls))
+
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=len(calls)) as executor:
+        return list(executor.map(lambda call: call(), calls))
@@ -0,0 +1,23 @@
+# Picked up automatically by gunicorn (see Procfile)
+import os
+
+# More than one worker needs SOCKETIO_MESSAGE_QUEUE, or chat messages, typing
+# state and the story feed split between workers (see DEPLOY.md). Without
+# one, run a single worker whatever WEB_CONCURRENCY the platform sets.
+requested_workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+if requested_workers > 1 and not os.environ.get("SOCKETIO_MESSAGE_QUEUE"):
+    workers = 1
+else:
+    workers = requested_workers
+
+
+def on_starting(server):
+    if workers != requested_workers:
+        server.log.error("WEB_CONCURRENCY=%s needs SOCKETIO_MESSAGE_QUEUE; "
+                         "starting 1 worker instead", requested_workers)
+
+
+def worker_exit(server, worker):
+    # Write any likes still buffered in memory before the worker goes away
+    import db
+    db.flush_likes()
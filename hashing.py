@@ -0,0 +1,95 @@
+"""Password hashing kept off the eventlet hub.
+
+PBKDF2/scrypt hashes take tens of milliseconds of pure CPU. Run inline on the
+single eventlet worker they stall every socket, so they are sent to eventlet's
+native thread pool (tpool) instead, behind a bounded queue.
+"""
+import os
+import sys
+import threading
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Hashes running at once; keep at or below EVENTLET_THREADPOOL_SIZE (default 20)
+HASH_POOL_SIZE = int(os.environ.get("HASH_POOL_SIZE", 4))
+# Requests allowed to wait for a slot before new ones are rejected
+HASH_QUEUE_LIMIT = int(os.environ.get("HASH_QUEUE_LIMIT", 32))
+
+
+class HashPoolFull(Exception):
+    """Too many hashes are already queued. Retryable: answer 503 + Retry-After."""
+
+    retry_after = 1
+
+
+def offload(fn, *args):
+    """Run a CPU-bound `fn(*args)` without blocking the eventlet hub."""
+    eventlet = sys.modules.get('eventlet')
+    if eventlet is not None and eventlet.patcher.is_monkey_patched('thread'):
+        from eventlet import tpool
+        return tpool.execute(fn, *args)
+    # Plain threaded server: the request thread can block on its own
+    return fn(*args)
+
+
+class HashPool:
+    def __init__(self, size=HASH_POOL_SIZE, queue_limit=HASH_QUEUE_LIMIT):
+        self.size = size
+        self.queue_limit = queue_limit
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.max_waiting = 0
+
+    def run(self, fn, *args):
+        with self._lock:
+            if self.waiting >= self.queue_limit:
+                self.rejected += 1
+                raise HashPoolFull("Too many logins in progress, please retry")
+            self.waiting += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+
+        try:
+            self._slots.acquire()
+        finally:
+            with self._lock:
+                self.waiting -= 1
+
+        try:
+            with self._lock:
+                self.running += 1
+            return offload(fn, *args)
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+            self._slots.release()
+
+    def stats(self):
+        return {
+            'size': self.size,
+            'queueLimit': self.queue_limit,
+            'running': self.running,
+            'waiting': self.waiting,
+            'maxWaiting': self.max_waiting,
+            'completed': self.completed,
+            'rejected': self.rejected
+        }
+
+
+pool = HashPool()
+
+
+def hash_password(password):
+    return pool.run(generate_password_hash, password)
+
+
+def verify_password(password_hash, password):
+    return pool.run(check_password_hash, password_hash, password)
+
+
+def stats():
+    return pool.stats()
@@ -0,0 +1,205 @@
+"""Profile photo uploads: streamed to disk, processed in the background.
+
+The upload request only copies the file to disk (hashing it as it goes) and
+queues it. A worker then fixes the EXIF orientation, strips metadata and
+writes WebP variants at fixed sizes, named by the content hash of the
+original so the same photo is only ever processed and stored once:
+
+    static/uploads/photos/<sha256>-<size>.webp
+
+Originals are kept in UPLOAD_ORIGINALS (not under static/, since they
+still carry EXIF data such as GPS position). When the variants are ready
+the profile gets `photo` (the 'large' variant) and `photoVariants`
+{size name: url}; list views should use 'thumb'.
+
+Pillow is imported only when a photo is actually uploaded or processed.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import db
+from hashing import offload
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PHOTO_FOLDER = os.path.join(BASE_DIR, 'static', 'uploads', 'photos')
+PHOTO_URL_PREFIX = '/static/uploads/photos'
+UPLOAD_ORIGINALS = os.environ.get("UPLOAD_ORIGINALS", os.path.join(BASE_DIR, 'uploads', 'originals'))
+
+# Variant name -> longest edge in pixels
+PHOTO_SIZES = {'thumb': 96, 'small': 256, 'large': 1024}
+WEBP_QUALITY = int(os.environ.get("WEBP_QUALITY", 80))
+# Photos processed at once; each one runs in eventlet's native thread pool
+IMAGE_POOL_SIZE = int(os.environ.get("IMAGE_POOL_SIZE", 2))
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+def variant_urls(content_hash):
+    return {name: f"{PHOTO_URL_PREFIX}/{content_hash}-{name}.webp" for name in PHOTO_SIZES}
+
+
+def _variant_path(content_hash, name):
+    return os.path.join(PHOTO_FOLDER, f"{content_hash}-{name}.webp")
+
+
+def variants_exist(content_hash):
+    return all(os.path.exists(_variant_path(content_hash, name)) for name in PHOTO_SIZES)
+
+
+def save_upload(file_storage):
+    """Stream an uploaded file to UPLOAD_ORIGINALS; return (content hash, path).
+
+    The file is written under a temporary name while being hashed, then
+    renamed to its hash. If that original is already on disk the copy is
+    dropped. Raises ValueError, keeping nothing, if Pillow can't read it as
+    an image.
+    """
+    os.makedirs(UPLOAD_ORIGINALS, exist_ok=True)
+    digest = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(dir=UPLOAD_ORIGINALS, suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = file_storage.stream.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+        _verify_image(tmp_path)
+        content_hash = digest.hexdigest()
+        path = os.path.join(UPLOAD_ORIGINALS, content_hash)
+        if os.path.exists(path):
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, path)
+        return content_hash, path
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _verify_image(path):
+    # The extension check in the route trusts the client's filename
+    from PIL import Image
+
+    try:
+        with Image.open(path) as image:
+            image.verify()
+    except Exception:
+        raise ValueError("Uploaded file is not a valid image")
+
+
+def render_variants(source_path, content_hash):
+    """Write every PHOTO_SIZES variant of the original as WebP (CPU bound)."""
+    from PIL import Image, ImageOps
+
+    os.makedirs(PHOTO_FOLDER, exist_ok=True)
+    with Image.open(source_path) as image:
+        image = ImageOps.exif_transpose(image)
+        # Palette (GIF/PNG-8) and some greyscale images keep transparency in
+        # image.info rather than in a band; converting them straight to RGB
+        # turns transparent pixels black
+        if image.mode in ('P', 'PA') or 'transparency' in image.info:
+            image = image.convert('RGBA')
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+        for name, size in PHOTO_SIZES.items():
+            variant = image.copy()
+            variant.thumbnail((size, size), Image.LANCZOS)
+            path = _variant_path(content_hash, name)
+            # Written under a temp name so a half-written file is never served
+            tmp_path = f"{path}.{threading.get_ident()}.part"
+            variant.save(tmp_path, 'WEBP', quality=WEBP_QUALITY, method=4)
+            os.replace(tmp_path, path)
+
+
+class ImagePipeline:
+    def __init__(self, size=IMAGE_POOL_SIZE):
+        self.size = size
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix='photo')
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.completed = 0
+        self.failed = 0
+        self.deduplicated = 0
+
+    def submit(self, user_id, content_hash, source_path):
+        """Publish the variants for `user_id`, rendering them first if needed.
+
+        Returns 'ready' when they already exist, else 'processing'.
+        """
+        if variants_exist(content_hash):
+            with self._lock:
+                self.deduplicated += 1
+            self._publish(user_id, content_hash)
+            return 'ready'
+
+        with self._lock:
+            self.queued += 1
+        self._executor.submit(self._process, user_id, content_hash, source_path)
+        return 'processing'
+
+    def _process(self, user_id, content_hash, source_path):
+        try:
+            if not variants_exist(content_hash):
+                offload(render_variants, source_path, content_hash)
+            self._publish(user_id, content_hash)
+            with self._lock:
+                self.completed += 1
+        except Exception:
+            logger.exception("Error processing photo %s for %s", content_hash, user_id)
+            with self._lock:
+                self.failed += 1
+            self._update_if_current(user_id, content_hash, {"photoStatus": "failed"})
+        finally:
+            with self._lock:
+                self.queued -= 1
+
+    def _publish(self, user_id, content_hash):
+        variants = variant_urls(content_hash)
+        self._update_if_current(user_id, content_hash, {
+            "photo": variants['large'],
+            "photoVariants": variants,
+            "photoStatus": "ready"
+        })
+
+    def _update_if_current(self, user_id, content_hash, updates):
+        # A newer upload may have replaced this one while it was processing
+        user = db.get_user_by_id(user_id)
+        if user is None or (user.get('profile_data') or {}).get("photoHash") != content_hash:
+            return
+        db.update_user_profile(user_id, updates)
+
+    def stats(self):
+        return {
+            'size': self.size,
+            'queued': self.queued,
+            'completed': self.completed,
+            'failed': self.failed,
+            'deduplicated': self.deduplicated
+        }
+
+
+pipeline = ImagePipeline()
+
+
+def upload_profile_photo(user_id, file_storage):
+    """Store the upload and queue its processing.
+
+    Returns (status, variant urls), or None if the user does not exist.
+    """
+    if db.get_user_by_id(user_id) is None:
+        return None
+    content_hash, path = save_upload(file_storage)
+    db.update_user_profile(user_id, {"photoHash": content_hash, "photoStatus": "processing"})
+    status = pipeline.submit(user_id, content_hash, path)
+    return status, variant_urls(content_hash)
+
+
+def stats():
+    return pipeline.stats()
@@ -1,5 +1,6 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, jsonify
-from matching_model import calculate_similarity
+from flask import Blueprint, render_template, redirect, url_for, flash, jsonify, request
+import db
+from matching_model import InterestIndex, MatchGraph, RecommendationCache
 
 matching_bp = Blueprint("matching", __name__)
 
@@ -54,11 +55,58 @@ users = [
 ]
 
 
-matches = []
+users_by_id = {u["id"]: u for u in users}
+
+# Built from the demo list above; saved profiles are added as they change
+# (see profile_changed below)
+interest_index = InterestIndex()
+for u in users:
+    interest_index.add(u["id"], u["interests"], u["role"])
+
+
+OPPOSITE_ROLES = {
+    "Senior": {"Youth"},
+    "Youth": {"Senior"}
+}
+
+
+match_graph = MatchGraph()
+
+# Ranked lists per user, patched on match changes and rebuilt in the
+# background when interests change
+recommendations = RecommendationCache(interest_index, match_graph, roles_for=OPPOSITE_ROLES.get)
 
 
 CURRENT_USER_ID = "u1"   # Margaret Chen
 
+# Profile ageGroup -> role used by the index
+ROLES_BY_AGE_GROUP = {"senior": "Senior", "youth": "Youth"}
+
+
+@db.on_profile_change
+def profile_changed(user_id, profile):
+    """Re-index a saved profile so recommendations follow its interests and role."""
+    role = ROLES_BY_AGE_GROUP.get(profile.get("ageGroup"))
+    if role is None:
+        # Not onboarded yet, so it can't be matched
+        return
+    users_by_id[user_id] = {
+        "id": user_id,
+        "name": profile.get("name"),
+        "age": profile.get("age"),
+        "role": role,
+        "gender": profile.get("gender"),
+        "about": profile.get("bio", ""),
+        "interests": profile.get("interests") or [],
+        "photoVariants": profile.get("photoVariants")
+    }
+    recommendations.update_user(user_id, profile.get("interests") or [], role)
+
+
+def thumbnail(user):
+    """Smallest processed photo for list views, or None (see images.py)."""
+    return (user.get("photoVariants") or {}).get("thumb")
+
 
 #matching
 @matching_bp.route("/matching")
@@ -69,27 +117,16 @@ def matching_page():
 
 @matching_bp.route("/api/recommendations")
 def get_recommendations_api():
-    current_user = next(u for u in users if u["id"] == CURRENT_USER_ID)
+    current_user = users_by_id[CURRENT_USER_ID]
+    limit = request.args.get("limit", type=int)
 
-    recommendations = []
+    ranked = recommendations.get(CURRENT_USER_ID, k=limit)
 
-    for user in users:
-        if user["id"] == CURRENT_USER_ID:
-            continue
+    results = []
 
-  
-        if current_user["role"] == "Senior" and user["role"] != "Youth":
-            continue
-
-        if current_user["role"] == "Youth" and user["role"] != "Senior":
-            continue
-
-        score = calculate_similarity(
-            current_user["interests"],
-            user["interests"]
-        )
-
-        recommendations.append({
+    for score, user_id in ranked:
+        user = users_by_id[user_id]
+        results.append({
             "id": user["id"],
             "name": user["name"],
             "age": user["age"],
@@ -97,29 +134,32 @@ def get_recommendations_api():
             "gender": user["gender"],
             "about": user["about"],
             "interests": user["interests"],
+            "photo": thumbnail(user),
             "score": score
         })
 
     return jsonify({
         "current_user_interests": current_user["interests"],
-        "users": recommendations
+        "users": results
     })
 
 
 #no duplicates
 @matching_bp.route("/match/<target_id>", methods=["POST"])
 def create_match(target_id):
-    for m in matches:
-        if m["user_id"] == CURRENT_USER_ID and m["target_id"] == target_id:
-            flash("You have already matched with this user.", "warning")
-            return redirect(url_for("matching.matching_page"))
-
-    matches.append({
-        "user_id": CURRENT_USER_ID,
-        "target_id": target_id
-    })
-
-    flash("Match successful!", "success")
+    if target_id not in users_by_id:
+        flash("User not found.", "warning")
+        return redirect(url_for("matching.matching_page"))
+
+    if not match_graph.add(CURRENT_USER_ID, target_id):
+        flash("You have already matched with this user.", "warning")
+        return redirect(url_for("matching.matching_page"))
+    recommendations.match_added(CURRENT_USER_ID, target_id)
+
+    if match_graph.is_mutual(CURRENT_USER_ID, target_id):
+        flash("It's a mutual match!", "success")
+    else:
+        flash("Match successful!", "success")
     return redirect(url_for("matching.matching_page"))
 
 
@@ -128,17 +168,20 @@ def create_match(target_id):
 def view_matches():
     user_matches = []
 
-    for m in matches:
-        if m["user_id"] == CURRENT_USER_ID:
-            target_user = next(u for u in users if u["id"] == m["target_id"])
+    for target_id in match_graph.targets(CURRENT_USER_ID):
+        target_user = users_by_id.get(target_id)
+        if target_user is None:
+            continue
 
-            user_matches.append({
-                "id": target_user["id"],
-                "name": target_user["name"],
-                "age": target_user["age"],
-                "role": target_user["role"],
-                "gender": target_user["gender"]
-            })
+        user_matches.append({
+            "id": target_user["id"],
+            "name": target_user["name"],
+            "age": target_user["age"],
+            "role": target_user["role"],
+            "gender": target_user["gender"],
+            "photo": thumbnail(target_user),
+            "mutual": match_graph.is_mutual(CURRENT_USER_ID, target_id)
+        })
 
     return render_template("matches.html", matches=user_matches)
 
@@ -146,15 +189,8 @@ def view_matches():
 
 @matching_bp.route("/match/remove/<target_id>")
 def remove_match(target_id):
-    global matches
-
-
-    print("Removing match:", CURRENT_USER_ID, target_id)
-
-    matches = [
-        m for m in matches
-        if not (m["user_id"] == CURRENT_USER_ID and m["target_id"] == target_id)
-    ]
+    if match_graph.remove(CURRENT_USER_ID, target_id):
+        recommendations.match_removed(CURRENT_USER_ID, target_id)
 
     flash("Match removed successfully.", "warning")
     return redirect(url_for("matching.view_matches"))
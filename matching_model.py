@@ -1,3 +1,18 @@
+import bisect
+import heapq
+import logging
+import os
+import threading
+from collections import defaultdict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _similarity_percent(common, total):
+    return round((common / total) * 100)
+
 
 def calculate_similarity(user_interests, target_interests):
     if not user_interests or not target_interests:
@@ -9,4 +24,431 @@ def calculate_similarity(user_interests, target_interests):
     common = user_set.intersection(target_set)
     total = user_set.union(target_set)
 
-    return round((len(common) / len(total)) * 100)
+    return _similarity_percent(len(common), len(total))
+
+
+# --- Batch scoring ---
+#
+# Interests are encoded as packed bitmasks over a shared vocabulary so that a
+# whole cohort can be scored with vectorised AND + popcount instead of building
+# two Python sets per pair.
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint16)
+
+# Upper bound on the temporary AND array built per chunk in pairwise_similarity
+_PAIRWISE_CHUNK_BYTES = 64 * 1024 * 1024
+
+
+def build_vocabulary(*interest_groups):
+    """Map every interest found in the given lists of interest lists to a bit."""
+    vocabulary = {}
+    for group in interest_groups:
+        for interests in group:
+            for interest in interests or ():
+                if interest not in vocabulary:
+                    vocabulary[interest] = len(vocabulary)
+    return vocabulary
+
+
+def encode_interests(interest_lists, vocabulary):
+    """Encode a list of interest lists as an (n, ceil(V / 8)) uint8 bitmask."""
+    bits = np.zeros((len(interest_lists), max(len(vocabulary), 1)), dtype=bool)
+    for row, interests in enumerate(interest_lists):
+        for interest in interests or ():
+            bits[row, vocabulary[interest]] = True
+    return np.packbits(bits, axis=1)
+
+
+def _popcount(masks):
+    return _POPCOUNT[masks].sum(axis=-1, dtype=np.int64)
+
+
+def _scores(common, user_sizes, target_sizes):
+    # |A | B| == |A| + |B| - |A & B|, which saves a second pass over the masks
+    total = user_sizes + target_sizes - common
+    ratio = np.divide(common, total, out=np.zeros(common.shape), where=total > 0)
+    # np.rint rounds half to even, exactly like round() in calculate_similarity
+    return np.rint(ratio * 100).astype(np.int64)
+
+
+def batch_similarity(user_interests, cohort_interests, vocabulary=None):
+    """Score one user against a whole cohort.
+
+    Returns an int array with the same values calculate_similarity would
+    return for each (user_interests, cohort_interests[i]) pair.
+    """
+    if vocabulary is None:
+        vocabulary = build_vocabulary([user_interests], cohort_interests)
+    user_mask = encode_interests([user_interests], vocabulary)[0]
+    cohort_masks = encode_interests(cohort_interests, vocabulary)
+
+    common = _popcount(cohort_masks & user_mask)
+    return _scores(common, _popcount(user_mask), _popcount(cohort_masks))
+
+
+def pairwise_similarity(seniors_interests, youths_interests, vocabulary=None):
+    """Score every senior against every youth.
+
+    Returns an int array of shape (len(seniors_interests), len(youths_interests))
+    where [i, j] equals calculate_similarity(seniors_interests[i], youths_interests[j]).
+    """
+    if vocabulary is None:
+        vocabulary = build_vocabulary(seniors_interests, youths_interests)
+    senior_masks = encode_interests(seniors_interests, vocabulary)
+    youth_masks = encode_interests(youths_interests, vocabulary)
+    senior_sizes = _popcount(senior_masks)
+    youth_sizes = _popcount(youth_masks)
+
+    scores = np.zeros((len(senior_masks), len(youth_masks)), dtype=np.int64)
+    row_bytes = max(youth_masks.size, 1)
+    chunk = max(1, _PAIRWISE_CHUNK_BYTES // row_bytes)
+    for start in range(0, len(senior_masks), chunk):
+        block = senior_masks[start:start + chunk]
+        common = _popcount(block[:, None, :] & youth_masks[None, :, :])
+        scores[start:start + chunk] = _scores(
+            common, senior_sizes[start:start + chunk, None], youth_sizes[None, :]
+        )
+    return scores
+
+
+class InterestIndex:
+    """Inverted interest -> user id index used to generate match candidates.
+
+    Only users sharing at least one interest with the current user are ever
+    scored; everyone else is a zero-score fallback used to fill the list.
+    """
+
+    def __init__(self):
+        self.postings = defaultdict(set)   # interest -> user ids
+        self.by_role = defaultdict(set)    # role -> user ids
+        self.interests = {}                # user id -> set of interests
+        self.roles = {}                    # user id -> role
+
+    def add(self, user_id, interests, role):
+        if user_id in self.interests:
+            self.remove(user_id)
+
+        interest_set = set(interests or [])
+        self.interests[user_id] = interest_set
+        self.roles[user_id] = role
+        self.by_role[role].add(user_id)
+        for interest in interest_set:
+            self.postings[interest].add(user_id)
+
+    def remove(self, user_id):
+        for interest in self.interests.pop(user_id, ()):
+            posting = self.postings[interest]
+            posting.discard(user_id)
+            if not posting:
+                del self.postings[interest]
+
+        role = self.roles.pop(user_id, None)
+        if role in self.by_role:
+            self.by_role[role].discard(user_id)
+
+    def score(self, user_id, other_id):
+        """Similarity of two indexed users, as top_k would score it."""
+        mine = self.interests.get(user_id, set())
+        theirs = self.interests.get(other_id, set())
+        common = len(mine & theirs)
+        if not common:
+            return 0
+        return _similarity_percent(common, len(mine) + len(theirs) - common)
+
+    def top_k(self, user_id, k=None, roles=None, exclude=()):
+        """Return [(score, user_id)] for the best `k` candidates, best first.
+
+        `roles` restricts candidates to those roles (None means any role) and
+        `exclude` is a set of user ids to skip in addition to the user itself.
+        """
+        user_interests = self.interests.get(user_id, set())
+
+        def eligible(candidate_id):
+            if candidate_id == user_id or candidate_id in exclude:
+                return False
+            return roles is None or self.roles.get(candidate_id) in roles
+
+        # Count shared interests by walking only the relevant postings
+        common = defaultdict(int)
+        for interest in user_interests:
+            for candidate_id in self.postings.get(interest, ()):
+                if eligible(candidate_id):
+                    common[candidate_id] += 1
+
+        user_size = len(user_interests)
+        scored = (
+            (_similarity_percent(n, user_size + len(self.interests[cid]) - n), cid)
+            for cid, n in common.items()
+        )
+        if k is None:
+            ranked = sorted(scored, key=lambda item: item[0], reverse=True)
+        else:
+            ranked = heapq.nlargest(k, scored, key=lambda item: item[0])
+
+        # Fall back to zero-overlap users when there are not enough candidates
+        if k is None or len(ranked) < k:
+            pools = [self.by_role[r] for r in roles] if roles is not None else [self.roles.keys()]
+            for pool in pools:
+                for candidate_id in pool:
+                    if k is not None and len(ranked) >= k:
+                        break
+                    if candidate_id not in common and eligible(candidate_id):
+                        ranked.append((0, candidate_id))
+
+        return ranked
+
+
+class MatchGraph:
+    """Directed "user matched with target" edges kept as per-user adjacency.
+
+    `matched[u]` holds the ids u matched with and `matched_by[u]` the ids that
+    matched u, so duplicate checks, adds and removals are O(1) and a mutual
+    match is an edge present in both directions. Adjacency is stored as dicts
+    used as ordered sets so users see their matches in the order made. Updates
+    take a lock (a green lock under eventlet), so one graph can be shared by
+    every request.
+    """
+
+    def __init__(self):
+        self.matched = {}      # user id -> {target id: None}
+        self.matched_by = {}   # target id -> {user id: None}
+        self.edge_count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self.edge_count
+
+    def has(self, user_id, target_id):
+        return target_id in self.matched.get(user_id, ())
+
+    def is_mutual(self, user_id, target_id):
+        return self.has(user_id, target_id) and self.has(target_id, user_id)
+
+    def add(self, user_id, target_id):
+        """Add the edge; return False if it already existed."""
+        with self._lock:
+            targets = self.matched.setdefault(user_id, {})
+            if target_id in targets:
+                return False
+            targets[target_id] = None
+            self.matched_by.setdefault(target_id, {})[user_id] = None
+            self.edge_count += 1
+            return True
+
+    def remove(self, user_id, target_id):
+        """Remove the edge; return False if there was none."""
+        with self._lock:
+            targets = self.matched.get(user_id)
+            if not targets or target_id not in targets:
+                return False
+            del targets[target_id]
+            if not targets:
+                del self.matched[user_id]
+            sources = self.matched_by[target_id]
+            del sources[user_id]
+            if not sources:
+                del self.matched_by[target_id]
+            self.edge_count -= 1
+            return True
+
+    def remove_user(self, user_id):
+        """Drop every edge to or from `user_id`."""
+        for target_id in list(self.matched.get(user_id, ())):
+            self.remove(user_id, target_id)
+        for source_id in list(self.matched_by.get(user_id, ())):
+            self.remove(source_id, user_id)
+
+    def targets(self, user_id):
+        """Ids `user_id` matched with, oldest match first."""
+        return list(self.matched.get(user_id, ()))
+
+    def mutual(self, user_id):
+        """Ids that `user_id` matched with and that matched `user_id` back."""
+        matched_by = self.matched_by.get(user_id, {})
+        return [target_id for target_id in self.matched.get(user_id, ()) if target_id in matched_by]
+
+
+# Length of each cached recommendation list
+RECOMMENDATION_K = int(os.environ.get("RECOMMENDATION_K", 100))
+
+
+class RecommendationCache:
+    """Each user's ranked top-K recommendations, precomputed and kept fresh
+    incrementally so serving a list is a dict lookup.
+
+    - A profile change (interests or role) marks stale the user's own list,
+      the lists of users sharing an old or new interest with them, every
+      list that currently holds the user (found through a reverse index,
+      which covers zero-score fallbacks), and every list shorter than K
+      that the user's new role could be added to. A background thread
+      rebuilds stale lists; until it does, the previous list is served.
+    - A new or removed match is patched straight into the user's list.
+    - Users without a list yet get one computed on first request.
+
+    `roles_for(role)` gives the roles a user with `role` is recommended
+    (None for any role). Matched users are left out via `graph`.
+    """
+
+    def __init__(self, index, graph, roles_for=lambda role: None, k=RECOMMENDATION_K):
+        self.index = index
+        self.graph = graph
+        self.roles_for = roles_for
+        self.k = k
+        self.lists = {}      # user id -> [(score, user id)], best first
+        self._holders = defaultdict(set)   # user id -> owners of lists containing it
+        self._short = set()  # owners whose list has fewer than k entries
+        self._stale = set()
+        # user id -> generation, bumped by _mark_stale while a first list is computed
+        self._computing = {}
+        self._lock = threading.Lock()
+        # Serialises index updates with the worker's reads of the index
+        self._index_lock = threading.RLock()
+        self._wake = threading.Event()
+        self._worker = None
+        self.rebuilds = 0
+
+    def _compute(self, user_id, k):
+        with self._index_lock:
+            return self.index.top_k(
+                user_id, k=k,
+                roles=self.roles_for(self.index.roles.get(user_id)),
+                exclude=set(self.graph.targets(user_id))
+            )
+
+    def _store(self, owner, ranked):
+        """Replace `owner`'s list, keeping the reverse index in step (hold _lock)."""
+        for _, user_id in self.lists.get(owner, ()):
+            holders = self._holders.get(user_id)
+            if holders is not None:
+                holders.discard(owner)
+                if not holders:
+                    del self._holders[user_id]
+        for _, user_id in ranked:
+            self._holders[user_id].add(owner)
+        if len(ranked) < self.k:
+            self._short.add(owner)
+        else:
+            self._short.discard(owner)
+        self.lists[owner] = ranked
+
+    def get(self, user_id, k=None):
+        """Return up to `k` (default self.k) [(score, user id)], best first."""
+        if k is not None:
+            k = max(k, 0)
+            if k > self.k:
+                return self._compute(user_id, k)
+        with self._lock:
+            ranked = self.lists.get(user_id)
+            if ranked is None:
+                generation = self._computing.setdefault(user_id, 0)
+        if ranked is None:
+            ranked = self._compute(user_id, self.k)
+            with self._lock:
+                # An update while computing may not be reflected in `ranked`:
+                # store it anyway, but as stale so the worker rebuilds it
+                changed = self._computing.pop(user_id, generation) != generation
+                if user_id not in self.lists:
+                    self._store(user_id, ranked)
+                if changed:
+                    self._stale.add(user_id)
+            if changed:
+                self._start_worker()
+                self._wake.set()
+        return ranked[:k] if k is not None else list(ranked)
+
+    def update_user(self, user_id, interests, role):
+        """Re-index a user and queue rebuilds for the lists it can affect."""
+        with self._index_lock:
+            old_interests = self.index.interests.get(user_id, set())
+            new_interests = set(interests or [])
+            if user_id in self.index.roles and old_interests == new_interests \
+                    and self.index.roles[user_id] == role:
+                return
+
+            self.index.add(user_id, new_interests, role)
+            affected = {user_id}
+            # Lists the user can now score in, or could drop out of
+            for interest in old_interests | new_interests:
+                affected.update(self.index.postings.get(interest, ()))
+            with self._lock:
+                # Lists holding the user, even as a zero-score fallback
+                affected.update(self._holders.get(user_id, ()))
+                # Lists with a free slot the user could fill as a fallback
+                for owner in self._short:
+                    roles = self.roles_for(self.index.roles.get(owner))
+                    if roles is None or role in roles:
+                        affected.add(owner)
+        self._mark_stale(affected)
+
+    def match_added(self, user_id, target_id):
+        with self._lock:
+            ranked = self.lists.get(user_id)
+            if ranked is None:
+                return
+            was_full = len(ranked) >= self.k
+            self._store(user_id, [item for item in ranked if item[1] != target_id])
+        if was_full:
+            # One slot opened up; refill it off the request path
+            self._mark_stale([user_id])
+
+    def match_removed(self, user_id, target_id):
+        with self._index_lock:
+            roles = self.roles_for(self.index.roles.get(user_id))
+            target_role = self.index.roles.get(target_id)
+            if target_id not in self.index.roles or (roles is not None and target_role not in roles):
+                return
+            score = self.index.score(user_id, target_id)
+        with self._lock:
+            ranked = self.lists.get(user_id)
+            if ranked is None or any(item[1] == target_id for item in ranked):
+                return
+            # After every entry with the same or a higher score
+            pos = bisect.bisect_right([-item[0] for item in ranked], -score)
+            if pos < self.k:
+                self._store(user_id, (ranked[:pos] + [(score, target_id)] + ranked[pos:])[:self.k])
+
+    def _mark_stale(self, user_ids):
+        with self._lock:
+            # Only lists that exist need rebuilding; the rest are built on demand
+            for user_id in user_ids:
+                if user_id in self.lists:
+                    self._stale.add(user_id)
+                elif user_id in self._computing:
+                    self._computing[user_id] += 1
+            if not self._stale:
+                return
+        self._start_worker()
+        self._wake.set()
+
+    def rebuild_stale(self):
+        """Rebuild every stale list now; returns how many were rebuilt."""
+        with self._lock:
+            stale, self._stale = list(self._stale), set()
+        for i, user_id in enumerate(stale):
+            try:
+                ranked = self._compute(user_id, self.k)
+            except Exception:
+                with self._lock:
+                    self._stale.update(stale[i:])
+                raise
+            with self._lock:
+                self._store(user_id, ranked)
+            self.rebuilds += 1
+        return len(stale)
+
+    def _worker_loop(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            try:
+                self.rebuild_stale()
+            except Exception:
+                logger.exception("Error rebuilding recommendations")
+
+    def _start_worker(self):
+        if self._worker is not None:
+            return
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._worker_loop, daemon=True)
+                self._worker.start()
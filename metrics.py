@@ -0,0 +1,204 @@
+"""In-process request, Socket.IO and database metrics in Prometheus text format.
+
+Kept dependency-free: a couple of thread-safe counters/histograms and a
+render() that /api/metrics serves. Every StorageBackend call is timed through
+backends.instrumented, and the calls made while handling a request or a
+Socket.IO event are kept in g.db_calls so storage calls per request can be
+counted (an N+1 shows up as a long tail in db_calls_per_request). These are
+backend method calls, not HTTP requests: one call may make several
+PostgREST requests (e.g. match_ids), and transport retries are not counted.
+"""
+import functools
+import re
+import threading
+import time
+
+from flask import g, has_request_context, request
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+CALL_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_labels(self.labelnames, labels)} {_number(value)}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.buckets = tuple(buckets) + (float('inf'),)
+        self._series = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    le = (('le', _number(bound)),)
+                    lines.append(f'{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}')
+                lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {_number(series[-2])}')
+                lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {series[-1]}')
+        return lines
+
+
+HTTP_REQUEST_SECONDS = Histogram(
+    'http_request_duration_seconds', 'Flask request latency by route.',
+    ('route', 'method', 'status'))
+SOCKETIO_EVENT_SECONDS = Histogram(
+    'socketio_event_duration_seconds', 'Socket.IO event handler latency.', ('event',))
+DB_CALL_SECONDS = Histogram(
+    'db_call_duration_seconds', 'Storage backend call latency by table and operation.',
+    ('backend', 'table', 'operation', 'call'))
+DB_CALL_ERRORS = Counter(
+    'db_call_errors_total', 'Storage backend calls that raised.',
+    ('backend', 'table', 'operation', 'call'))
+DB_CALLS_PER_REQUEST = Histogram(
+    'db_calls_per_request', 'Storage backend calls made while handling one request or event.',
+    ('endpoint',), buckets=CALL_COUNT_BUCKETS)
+
+_metrics = [HTTP_REQUEST_SECONDS, SOCKETIO_EVENT_SECONDS, DB_CALL_SECONDS, DB_CALL_ERRORS, DB_CALLS_PER_REQUEST]
+_gauge_sources = []
+
+
+def register_gauges(prefix, stats, help):
+    """Expose every numeric value of the dict returned by `stats()` as a gauge
+    named <prefix>_<key> (camelCase keys are converted to snake_case)."""
+    _gauge_sources.append((prefix, stats, help))
+
+
+def _snake(key):
+    return re.sub(r'(?<!^)([A-Z])', r'_\1', key).lower()
+
+
+def _render_gauges():
+    lines = []
+    for prefix, stats, help in _gauge_sources:
+        for key, value in stats().items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            name = f'{prefix}_{_snake(key)}'
+            lines += [f'# HELP {name} {help}', f'# TYPE {name} gauge', f'{name} {_number(value)}']
+    return lines
+
+
+def render():
+    lines = []
+    for metric in _metrics:
+        lines += metric.render()
+    lines += _render_gauges()
+    return '\n'.join(lines) + '\n'
+
+
+# --- Recording ---
+
+def request_db_calls():
+    """Storage calls made so far in the current request/event, or None outside one."""
+    if not has_request_context():
+        return None
+    if 'db_calls' not in g:
+        g.db_calls = []
+    return g.db_calls
+
+
+def record_db_call(backend, call, table, operation, seconds, error=False):
+    DB_CALL_SECONDS.observe(seconds, backend, table, operation, call)
+    if error:
+        DB_CALL_ERRORS.inc(backend, table, operation, call)
+    calls = request_db_calls()
+    if calls is not None:
+        calls.append({'call': call, 'table': table, 'operation': operation,
+                      'ms': round(seconds * 1000, 3), 'error': error})
+
+
+def _db_call_count():
+    return len(g.get('db_calls') or ())
+
+
+def init_app(app):
+    """Time every request and count its storage calls."""
+
+    @app.before_request
+    def _start_timer():
+        g.request_started = time.perf_counter()
+        g.db_calls = []
+
+    @app.after_request
+    def _record_request(response):
+        started = g.pop('request_started', None)
+        if started is not None:
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started,
+                                         route, request.method, str(response.status_code))
+            DB_CALLS_PER_REQUEST.observe(_db_call_count(), route)
+        return response
+
+    @app.teardown_request
+    def _record_failed_request(error):
+        # after_request is skipped when a view raises; count those as 500s
+        started = g.pop('request_started', None)
+        if started is not None:
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, route, request.method, '500')
+            DB_CALLS_PER_REQUEST.observe(_db_call_count(), route)
+
+
+def timed_event(event):
+    """Decorator for Socket.IO handlers: record latency and storage calls under `event`."""
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(*args, **kwargs):
+            g.db_calls = []
+            started = time.perf_counter()
+            try:
+                return handler(*args, **kwargs)
+            finally:
+                SOCKETIO_EVENT_SECONDS.observe(time.perf_counter() - started, event)
+                DB_CALLS_PER_REQUEST.observe(_db_call_count(), f'socketio:{event}')
+        return wrapper
+    return decorator
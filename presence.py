@@ -0,0 +1,94 @@
+"""Who is connected to this worker over Socket.IO.
+
+Tracks connections per user and rooms per connection; everything for a
+socket is dropped when it disconnects. A user counts as online while at
+least one of their connections is open, so several tabs or devices are fine.
+
+Each user coming online is announced once (see announce()); rooms the user
+joins later learn the state from /api/presence instead of another event.
+
+This state lives in the worker's memory, so it is only accurate with a
+single worker (WEB_CONCURRENCY=1). With several, each worker only knows its
+own sockets: a user connected to another worker looks offline here, and
+closing the last tab on one worker reports offline even if another worker
+still has a tab open.
+"""
+import threading
+
+
+class PresenceRegistry:
+    def __init__(self):
+        self._user_by_sid = {}   # sid -> user id
+        self._sids = {}          # user id -> set of sids
+        self._rooms = {}         # sid -> set of rooms
+        self._announced = set()  # users whose coming online has been announced
+        self._lock = threading.Lock()
+
+    def connect(self, sid, user_id):
+        """Attach a socket to a user; return True if the user just came online."""
+        with self._lock:
+            previous = self._user_by_sid.get(sid)
+            if previous == user_id:
+                return False
+            if previous is not None:
+                self._detach(sid, previous)
+            self._user_by_sid[sid] = user_id
+            sids = self._sids.setdefault(user_id, set())
+            sids.add(sid)
+            return len(sids) == 1
+
+    def _detach(self, sid, user_id):
+        sids = self._sids.get(user_id)
+        if sids is None:
+            return False
+        sids.discard(sid)
+        if not sids:
+            del self._sids[user_id]
+            self._announced.discard(user_id)
+            return True
+        return False
+
+    def announce(self, sid):
+        """Return the socket's user if its coming online has not been announced yet.
+
+        Only the first call after the user comes online returns it, so the
+        online event goes out once per transition rather than on every join.
+        """
+        with self._lock:
+            user_id = self._user_by_sid.get(sid)
+            if user_id is None or user_id in self._announced:
+                return None
+            self._announced.add(user_id)
+            return user_id
+
+    def join(self, sid, room):
+        with self._lock:
+            self._rooms.setdefault(sid, set()).add(room)
+
+    def leave(self, sid, room):
+        with self._lock:
+            rooms = self._rooms.get(sid)
+            if rooms:
+                rooms.discard(room)
+
+    def disconnect(self, sid):
+        """Forget a socket; return (user id, rooms it was in, whether the user went offline)."""
+        with self._lock:
+            rooms = self._rooms.pop(sid, set())
+            user_id = self._user_by_sid.pop(sid, None)
+            went_offline = user_id is not None and self._detach(sid, user_id)
+        return user_id, rooms, went_offline
+
+    def user_for(self, sid):
+        return self._user_by_sid.get(sid)
+
+    def is_online(self, user_id):
+        return user_id in self._sids
+
+    def online(self, user_ids):
+        """The subset of `user_ids` with an open connection."""
+        return [user_id for user_id in user_ids if user_id in self._sids]
+
+    def stats(self):
+        with self._lock:
+            return {'users': len(self._sids), 'connections': len(self._user_by_sid)}
@@ -0,0 +1,140 @@
+"""Opt-in slow-request log with sampled cProfile captures.
+
+When enabled, every request slower than SLOW_REQUEST_MS is appended to a
+JSONL slow log along with the storage calls it made (from metrics) and their
+durations. A SLOW_SAMPLE_RATE fraction of requests also runs under cProfile;
+those are logged whatever their latency, with the top functions by
+cumulative time. Settings can be changed at runtime through configure()
+(POST /api/admin/profiling) without a restart; they are per worker process.
+
+cProfile is not greenlet-aware. Under the eventlet worker it records
+everything that runs on the OS thread while the request is open, including
+other requests' greenlets that run whenever this one waits on I/O. A sampled
+profile is exact for CPU-bound stretches of the request, but functions that
+appear in it were not necessarily called by the request.
+"""
+import cProfile
+import json
+import os
+import pstats
+import random
+import threading
+import time
+from datetime import datetime
+
+from flask import g, request
+
+PROFILE_TOP_FUNCTIONS = 25
+
+
+def _flag(value):
+    """Parse an on/off setting; strings count only if '1', 'true' or 'yes'."""
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes')
+    return bool(value)
+
+
+settings = {
+    'enabled': _flag(os.environ.get("SLOW_LOG_ENABLED", "")),
+    'thresholdMs': float(os.environ.get("SLOW_REQUEST_MS", 500)),
+    'sampleRate': float(os.environ.get("SLOW_SAMPLE_RATE", 0)),
+    'path': os.environ.get("SLOW_LOG_PATH", "slow_requests.jsonl"),
+}
+
+_settings_lock = threading.Lock()
+_write_lock = threading.Lock()
+# cProfile hooks the whole OS thread, and green threads share one, so only one
+# request is profiled at a time; others that draw a sample are just timed.
+_profile_slot = threading.Lock()
+
+
+def configure(enabled=None, threshold_ms=None, sample_rate=None):
+    with _settings_lock:
+        if enabled is not None:
+            settings['enabled'] = _flag(enabled)
+        if threshold_ms is not None:
+            if threshold_ms < 0:
+                raise ValueError("thresholdMs must be >= 0")
+            settings['thresholdMs'] = float(threshold_ms)
+        if sample_rate is not None:
+            if not 0 <= sample_rate <= 1:
+                raise ValueError("sampleRate must be between 0 and 1")
+            settings['sampleRate'] = float(sample_rate)
+        return dict(settings)
+
+
+def _top_functions(profiler):
+    stats = pstats.Stats(profiler)
+    rows = []
+    for (filename, line, name), (_, calls, total, cumulative, _) in stats.stats.items():
+        rows.append({
+            'function': f"{os.path.basename(filename)}:{line}({name})",
+            'calls': calls,
+            'totalMs': round(total * 1000, 3),
+            'cumulativeMs': round(cumulative * 1000, 3),
+        })
+    rows.sort(key=lambda row: row['cumulativeMs'], reverse=True)
+    return rows[:PROFILE_TOP_FUNCTIONS]
+
+
+def write_entry(entry):
+    line = json.dumps(entry) + '\n'
+    with _write_lock:
+        with open(settings['path'], 'a') as f:
+            f.write(line)
+
+
+def init_app(app):
+    @app.before_request
+    def _start_capture():
+        if not settings['enabled']:
+            return
+        g.capture_started = time.perf_counter()
+        if random.random() < settings['sampleRate'] and _profile_slot.acquire(blocking=False):
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+
+    @app.after_request
+    def _remember_status(response):
+        if 'capture_started' in g:
+            g.capture_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def _finish_capture(error):
+        started = g.pop('capture_started', None)
+        if started is None:
+            return
+        duration_ms = (time.perf_counter() - started) * 1000
+
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            _profile_slot.release()
+
+        slow = duration_ms >= settings['thresholdMs']
+        if not slow and profiler is None:
+            return
+
+        db_calls = g.get('db_calls') or []
+        entry = {
+            'timestamp': datetime.now().isoformat(),
+            'method': request.method,
+            'path': request.full_path.rstrip('?'),
+            'route': request.url_rule.rule if request.url_rule else None,
+            'status': g.pop('capture_status', 500),
+            'durationMs': round(duration_ms, 3),
+            'slow': slow,
+            'sampled': profiler is not None,
+            'dbTimeMs': round(sum(call['ms'] for call in db_calls), 3),
+            'dbCalls': db_calls,
+        }
+        if error is not None:
+            entry['error'] = repr(error)
+        if profiler is not None:
+            entry['profile'] = _top_functions(profiler)
+
+        try:
+            write_entry(entry)
+        except Exception as e:
+            print(f"Error writing slow log: {e}")
@@ -0,0 +1,104 @@
+"""Message queue for Socket.IO, so emits reach clients on every worker.
+
+Without a queue, socketio.emit(..., room=...) only reaches clients connected
+to the emitting process, which is why the app used to run a single worker.
+SOCKETIO_MESSAGE_QUEUE selects the queue:
+
+- unset: no queue, single worker only
+- redis://host:6379/0 (or rediss://): Redis, or anything speaking its
+  pub/sub protocol (Valkey, KeyDB...), shared by every worker
+- local://: LocalPubSubManager, an in-process stand-in used by tests and
+  benchmarks to run several SocketIO servers in one process
+- amqp:// (or amqps://): RabbitMQ through kombu, which is not in
+  requirements.txt and has to be installed separately
+
+Any other URL is rejected at startup.
+"""
+import json
+import os
+import queue
+import threading
+
+import socketio
+
+SOCKETIO_MESSAGE_QUEUE = os.environ.get("SOCKETIO_MESSAGE_QUEUE", "")
+SOCKETIO_CHANNEL = os.environ.get("SOCKETIO_CHANNEL", "generalink-socketio")
+
+
+class LocalPubSubManager(socketio.PubSubManager):
+    """Pub/sub between the Socket.IO servers of one process.
+
+    Every manager subscribed to the same channel receives each published
+    message, JSON-encoded as it would be on Redis, so several servers in a
+    test or benchmark behave like workers sharing a real queue.
+    """
+
+    name = 'local'
+
+    _subscribers = {}  # channel -> [queue.Queue]
+    _subscribers_lock = threading.Lock()
+
+    def __init__(self, channel=SOCKETIO_CHANNEL, write_only=False, logger=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self._queue = queue.Queue()
+        if not write_only:
+            with self._subscribers_lock:
+                self._subscribers.setdefault(channel, []).append(self._queue)
+
+    def close(self):
+        """Stop receiving messages (the listener thread blocks until then)."""
+        with self._subscribers_lock:
+            subscribers = self._subscribers.get(self.channel, [])
+            if self._queue in subscribers:
+                subscribers.remove(self._queue)
+
+    def _publish(self, data):
+        message = json.dumps(data)
+        with self._subscribers_lock:
+            subscribers = list(self._subscribers.get(self.channel, ()))
+        for subscriber in subscribers:
+            subscriber.put(message)
+
+    def _listen(self):
+        while True:
+            yield self._queue.get()
+
+
+def create_client_manager(url, channel=SOCKETIO_CHANNEL):
+    """The pub/sub client manager for a queue URL (see the module docstring)."""
+    if url.startswith('local://'):
+        return LocalPubSubManager(channel=channel)
+    if url.startswith(('redis://', 'rediss://')):
+        return socketio.RedisManager(url, channel=channel)
+    if url.startswith(('amqp://', 'amqps://')):
+        try:
+            import kombu  # noqa: F401
+        except ImportError:
+            raise ValueError("SOCKETIO_MESSAGE_QUEUE is an AMQP URL, which needs kombu: pip install kombu")
+        return socketio.KombuManager(url, channel=channel)
+    scheme = url.split('://', 1)[0] if '://' in url else url
+    raise ValueError(f"Unsupported SOCKETIO_MESSAGE_QUEUE scheme {scheme!r}: "
+                     "use redis://, rediss://, amqp://, amqps:// or local://")
+
+
+def create_signal_channel(name, url=None):
+    """A cache.py-style channel (publish(key) / subscribe(callback)) between
+    the workers sharing the queue, for app state that emits don't carry.
+
+    Only Redis queues carry these signals between workers. With no queue,
+    local:// or AMQP, they stay inside this process.
+    """
+    url = SOCKETIO_MESSAGE_QUEUE if url is None else url
+    if url.startswith(('redis://', 'rediss://')):
+        from cache import RedisInvalidationChannel
+        return RedisInvalidationChannel(url, channel=f'{SOCKETIO_CHANNEL}:{name}')
+    from cache import LocalInvalidationChannel
+    return LocalInvalidationChannel()
+
+
+def socketio_options(url=None, channel=SOCKETIO_CHANNEL):
+    """Keyword arguments for SocketIO(...) that wire up the configured queue."""
+    url = SOCKETIO_MESSAGE_QUEUE if url is None else url
+    if not url:
+        return {}
+    return {'client_manager': create_client_manager(url, channel)}
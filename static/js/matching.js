@@ -60,7 +60,16 @@ function showCurrentUser() {
 
     const avatarDiv = document.getElementById("user-avatar");
     if (avatarDiv) {
-        avatarDiv.innerText = avatar;
+        if (user.photo) {
+            // Properties, not markup: name and photo are user-supplied
+            const img = document.createElement("img");
+            img.src = user.photo;
+            img.alt = user.name;
+            img.loading = "lazy";
+            avatarDiv.replaceChildren(img);
+        } else {
+            avatarDiv.innerText = avatar;
+        }
     }
 
 
@@ -36,11 +36,211 @@ create table public.stories (
   badges text -- Stored as comma-separated string or could be jsonb
 );
 
+-- Messages Table (one row per chat message, append-only)
+create table public.messages (
+  id bigint generated always as identity primary key,
+  conversation_id text not null,
+  sender_id text,
+  text text,
+  timestamp timestamp with time zone default timezone('utc'::text, now()) not null,
+  legacy_seq integer, -- position in the old kv_store blob, set only by the migration
+  unique (conversation_id, legacy_seq)
+);
+create index messages_conversation_id_idx on public.messages (conversation_id, id);
+
+-- Reports Table (one row per report, replaces the reports:* / admin:all-reports blobs)
+create table public.reports (
+  id bigint generated always as identity primary key,
+  conversation_id text not null,
+  reported_by text,
+  reason text,
+  details text,
+  timestamp timestamp with time zone default timezone('utc'::text, now()) not null,
+  status text not null default 'pending',
+  legacy_seq integer, -- position in the old kv_store blob, set only by the migration
+  unique (conversation_id, legacy_seq)
+);
+create index reports_status_idx on public.reports (status, id desc);
+create index reports_reason_idx on public.reports (reason, id desc);
+create index reports_conversation_idx on public.reports (conversation_id, id desc);
+create index reports_timestamp_idx on public.reports (timestamp);
+
+-- Report counts by status and reason, kept up to date by a trigger so the
+-- admin dashboard never has to count the reports table
+create table public.report_counts (
+  status text not null,
+  reason text not null,
+  count integer not null default 0,
+  primary key (status, reason)
+);
+
+create or replace function public.update_report_counts()
+returns trigger
+language plpgsql
+security definer -- report_counts is not writable through the API
+as $$
+begin
+  if tg_op in ('UPDATE', 'DELETE') then
+    update public.report_counts set count = count - 1
+    where status = old.status and reason = coalesce(old.reason, '');
+  end if;
+  if tg_op in ('INSERT', 'UPDATE') then
+    insert into public.report_counts (status, reason, count)
+    values (new.status, coalesce(new.reason, ''), 1)
+    on conflict (status, reason) do update set count = public.report_counts.count + 1;
+  end if;
+  return null;
+end;
+$$;
+
+create trigger reports_update_counts
+after insert or delete or update of status, reason on public.reports
+for each row execute function public.update_report_counts();
+
+-- Conversation membership with per-user unread counters, bumped as messages
+-- are saved so a conversation list is one indexed read
+create table public.conversation_members (
+  conversation_id text not null,
+  user_id text not null,
+  unread integer not null default 0,
+  last_read_id bigint,
+  last_message_id bigint,
+  last_message_at timestamp with time zone,
+  joined_at timestamp with time zone default timezone('utc'::text, now()) not null,
+  primary key (conversation_id, user_id)
+);
+create index conversation_members_user_idx on public.conversation_members (user_id, last_message_id desc);
+
+-- Indexes
+create index matches_match_id_idx on public.matches (match_id);
+create index stories_feed_idx on public.stories (timestamp desc, id desc);
+
+-- Potential matches for a user: opposite age group, minus the user and anyone
+-- they already matched (anti-join), projected to id + profile and paged.
+-- The age-group test is an inequality (IS DISTINCT FROM), which a btree on
+-- profile_data->>'ageGroup' cannot serve, and it keeps about half the table
+-- anyway, so the scan is driven by order by u.id (primary key).
+create or replace function public.get_potential_matches(
+  p_user_id text,
+  p_limit integer default null,
+  p_offset integer default 0
+)
+returns table (id text, profile_data jsonb)
+language sql stable
+as $$
+  select u.id, u.profile_data
+  from public.users u
+  cross join (
+    select coalesce(me.profile_data->>'ageGroup', '') as age_group
+    from public.users me
+    where me.id = p_user_id
+  ) me
+  where u.id <> p_user_id
+    and (u.profile_data->>'ageGroup') is distinct from me.age_group
+    and not exists (
+      select 1 from public.matches m
+      where m.user_id = p_user_id and m.match_id = u.id
+    )
+  order by u.id
+  limit p_limit offset p_offset;
+$$;
+
+-- Shallow-merge a patch into one user's profile in a single statement and
+-- return the merged document (same semantics as dict.update)
+create or replace function public.merge_profile(p_user_id text, p_patch jsonb)
+returns jsonb
+language sql
+as $$
+  update public.users
+  set profile_data = coalesce(profile_data, '{}'::jsonb) || p_patch
+  where id = p_user_id
+  returning profile_data;
+$$;
+
+-- Bulk variant: p_patches is {"<user id>": {<patch>}, ...}
+create or replace function public.merge_profiles(p_patches jsonb)
+returns table (id text, profile_data jsonb)
+language sql
+as $$
+  update public.users u
+  set profile_data = coalesce(u.profile_data, '{}'::jsonb) || p.value
+  from jsonb_each(p_patches) p
+  where u.id = p.key
+  returning u.id, u.profile_data;
+$$;
+
+-- Atomic like counters: a single UPDATE, so concurrent likes are never lost
+create or replace function public.increment_story_likes(p_story_id text, p_amount integer default 1)
+returns integer
+language sql
+as $$
+  update public.stories
+  set likes = coalesce(likes, 0) + p_amount
+  where id = p_story_id
+  returning likes;
+$$;
+
+-- Apply many buffered likes at once: p_counts is {"<story id>": <amount>, ...}
+create or replace function public.increment_story_likes_batch(p_counts jsonb)
+returns void
+language sql
+as $$
+  update public.stories s
+  set likes = coalesce(s.likes, 0) + c.value::integer
+  from jsonb_each_text(p_counts) c
+  where s.id = c.key;
+$$;
+
+-- After a message is saved: make the sender and the other participants
+-- members and bump every other member's unread count, in one round trip.
+-- The old four-argument version would be an ambiguous overload for the API.
+drop function if exists public.record_message(text, text, bigint, timestamp with time zone);
+
+create or replace function public.record_message(
+  p_conversation_id text,
+  p_sender_id text,
+  p_message_id bigint,
+  p_timestamp timestamp with time zone,
+  p_participant_ids text[] default '{}'
+)
+returns void
+language sql
+as $$
+  insert into public.conversation_members (conversation_id, user_id)
+  select distinct p_conversation_id, member_id
+  from unnest(array_prepend(p_sender_id, coalesce(p_participant_ids, '{}'))) as member_id
+  where member_id is not null
+  on conflict (conversation_id, user_id) do nothing;
+
+  update public.conversation_members
+  set unread = unread + case when user_id = p_sender_id then 0 else 1 end,
+      last_read_id = case when user_id = p_sender_id then p_message_id else last_read_id end,
+      last_message_id = p_message_id,
+      last_message_at = p_timestamp
+  where conversation_id = p_conversation_id;
+$$;
+
+-- Reset a member's unread count (joining the conversation if needed)
+create or replace function public.mark_conversation_read(p_conversation_id text, p_user_id text)
+returns setof public.conversation_members
+language sql
+as $$
+  insert into public.conversation_members as m (conversation_id, user_id)
+  values (p_conversation_id, p_user_id)
+  on conflict (conversation_id, user_id)
+  do update set unread = 0, last_read_id = m.last_message_id
+  returning *;
+$$;
+
 -- Enable Row Level Security (RLS) - Optional for now but good practice
 alter table public.kv_store enable row level security;
 alter table public.users enable row level security;
 alter table public.matches enable row level security;
 alter table public.stories enable row level security;
+alter table public.messages enable row level security;
+alter table public.reports enable row level security;
+alter table public.report_counts enable row level security;
+alter table public.conversation_members enable row level security;
 
 -- KV Store Policies
 create policy "KV store is accessible by everyone" on public.kv_store for all using (true);
@@ -56,3 +256,14 @@ create policy "Users can insert matches" on public.matches for insert with check
 create policy "Stories are viewable by everyone" on public.stories for select using (true);
 create policy "Users can insert stories" on public.stories for insert with check (true);
 create policy "Users can update stories" on public.stories for update using (true);
+
+create policy "Messages are viewable by everyone" on public.messages for select using (true);
+create policy "Users can insert messages" on public.messages for insert with check (true);
+
+create policy "Reports are viewable by everyone" on public.reports for select using (true);
+create policy "Users can insert reports" on public.reports for insert with check (true);
+create policy "Reports can be updated" on public.reports for update using (true);
+create policy "Report counts are viewable by everyone" on public.report_counts for select using (true);
+create policy "Conversation members are viewable by everyone" on public.conversation_members for select using (true);
+create policy "Users can join conversations" on public.conversation_members for insert with check (true);
+create policy "Conversation members can be updated" on public.conversation_members for update using (true);
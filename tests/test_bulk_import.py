@@ -0,0 +1,47 @@
+"""Importing the same file twice must update rows, not add new ones."""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bulk
+import db
+from backends.memory_backend import MemoryBackend
+
+
+def write_jsonl(path, records):
+    path.write_text(''.join(json.dumps(record) + '\n' for record in records))
+    return str(path)
+
+
+def test_reimporting_records_without_ids(tmp_path):
+    db.use_backend(MemoryBackend())
+    users = write_jsonl(tmp_path / 'users.jsonl', [
+        {'email': 'a@example.com', 'password_hash': 'x', 'name': 'A'},
+        {'email': 'b@example.com', 'password_hash': 'x', 'name': 'B'},
+    ])
+    stories = write_jsonl(tmp_path / 'stories.jsonl', [
+        {'author_id': 'a', 'content': 'Hello', 'timestamp': '2024-01-01T00:00:00'},
+        {'author_id': 'b', 'content': 'Hi', 'timestamp': '2024-01-02T00:00:00'},
+    ])
+
+    for _ in range(2):
+        bulk.import_records('users', users)
+        bulk.import_records('stories', stories)
+
+    assert sorted(row['email'] for row in db.iter_users()) == ['a@example.com', 'b@example.com']
+    assert len(list(db.iter_stories())) == 2
+
+
+def test_repeated_rows_in_a_batch(tmp_path):
+    db.use_backend(MemoryBackend())
+    users = write_jsonl(tmp_path / 'users.jsonl', [
+        {'email': 'a@example.com', 'password_hash': 'x', 'name': 'Old'},
+        {'email': 'a@example.com', 'password_hash': 'x', 'name': 'New'},
+    ])
+
+    assert bulk.import_records('users', users) == 1
+    rows = list(db.iter_users())
+    assert len(rows) == 1
+    assert rows[0]['profile_data']['name'] == 'New'
@@ -0,0 +1,133 @@
+"""RecommendationCache must serve the same lists a fresh rebuild would."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from matching_model import InterestIndex, MatchGraph, RecommendationCache
+
+OPPOSITE_ROLES = {"Senior": {"Youth"}, "Youth": {"Senior"}}
+
+
+class SyncCache(RecommendationCache):
+    """Rebuilds only when rebuild_stale() is called, never in the background."""
+
+    def _start_worker(self):
+        pass
+
+
+def make_cache(users, k=100):
+    index = InterestIndex()
+    for user_id, interests, role in users:
+        index.add(user_id, interests, role)
+    graph = MatchGraph()
+    return SyncCache(index, graph, roles_for=OPPOSITE_ROLES.get, k=k), graph
+
+
+def assert_fresh(cache):
+    cache.rebuild_stale()
+    for owner, cached in cache.lists.items():
+        fresh = cache._compute(owner, cache.k)
+        assert sorted(cached) == sorted(fresh), owner
+
+
+def seed(cache, *owners):
+    for owner in owners:
+        cache.get(owner)
+
+
+def test_new_user_without_shared_interests_fills_short_lists():
+    cache, _ = make_cache([("s1", ["Cooking"], "Senior"), ("y1", ["Cooking"], "Youth")])
+    seed(cache, "s1", "y1")
+    assert cache.get("s1") == [(100, "y1")]
+
+    cache.update_user("y2", ["Gaming"], "Youth")
+    assert_fresh(cache)
+    assert sorted(cache.get("s1")) == [(0, "y2"), (100, "y1")]
+
+
+def test_role_change_leaves_lists_it_no_longer_belongs_in():
+    cache, _ = make_cache([("s1", ["Cooking"], "Senior"), ("y3", ["Gaming"], "Youth")])
+    seed(cache, "s1", "y3")
+    assert cache.get("s1") == [(0, "y3")]
+
+    cache.update_user("y3", ["Gaming"], "Senior")
+    assert_fresh(cache)
+    assert cache.get("s1") == []
+    assert cache.get("y3") == []
+
+
+def test_interest_changes():
+    cache, _ = make_cache([
+        ("s1", ["Cooking", "History"], "Senior"),
+        ("s2", ["Music"], "Senior"),
+        ("y1", ["Cooking"], "Youth"),
+        ("y2", ["Music"], "Youth"),
+    ])
+    seed(cache, "s1", "s2", "y1", "y2")
+
+    # Gains an interest shared with s1, loses the one shared with s2
+    cache.update_user("y2", ["History"], "Youth")
+    assert_fresh(cache)
+    # Drops every interest: stays in lists only as a fallback
+    cache.update_user("y1", [], "Youth")
+    assert_fresh(cache)
+    assert (0, "y1") in cache.get("s1")
+
+
+def test_full_lists():
+    cache, _ = make_cache([
+        ("s1", ["Cooking", "History"], "Senior"),
+        ("y1", ["Cooking"], "Youth"),
+        ("y2", ["Gaming"], "Youth"),
+    ], k=2)
+    seed(cache, "s1")
+
+    # A better candidate displaces the zero-score fallback from a full list
+    cache.update_user("y3", ["Cooking", "History"], "Youth")
+    assert_fresh(cache)
+    assert cache.get("s1") == [(100, "y3"), (50, "y1")]
+
+
+def test_matches():
+    cache, graph = make_cache([
+        ("s1", ["Cooking"], "Senior"),
+        ("y1", ["Cooking"], "Youth"),
+        ("y2", ["Gaming"], "Youth"),
+    ], k=1)
+    seed(cache, "s1")
+
+    graph.add("s1", "y1")
+    cache.match_added("s1", "y1")
+    assert_fresh(cache)
+    assert cache.get("s1") == [(0, "y2")]
+
+    graph.remove("s1", "y1")
+    cache.match_removed("s1", "y1")
+    assert_fresh(cache)
+    assert cache.get("s1") == [(100, "y1")]
+
+    # y2 was dropped from s1's list above, so its change must not touch it
+    cache.update_user("y2", ["Gaming", "Chess"], "Youth")
+    assert_fresh(cache)
+
+
+def test_profile_updates_go_through_db(monkeypatch):
+    import db
+    import matching
+    from backends.memory_backend import MemoryBackend
+
+    db.use_backend(MemoryBackend())
+    cache, _ = make_cache([(u["id"], u["interests"], u["role"]) for u in matching.users])
+    monkeypatch.setattr(matching, "recommendations", cache)
+    monkeypatch.setattr(matching, "users_by_id", dict(matching.users_by_id))
+    seed(cache, "u1")
+
+    user_id = db.create_user({"email": "new@example.com", "password": "pw", "phone": "1", "nric": "S1"})["id"]
+    db.update_user_profile(user_id, {"ageGroup": "youth", "interests": ["Cooking", "History", "Gardening"]})
+    assert_fresh(cache)
+    assert cache.get("u1")[0] == (100, user_id)
+
+    db.update_user_profiles({user_id: {"interests": []}})
+    assert_fresh(cache)
+    assert (0, user_id) in cache.get("u1")
@@ -0,0 +1,81 @@
+"""Per-room typing state, so only started/stopped transitions are broadcast.
+
+Clients send a 'typing' event on every keystroke. Rebroadcasting each one
+costs a frame per room member per keystroke; instead the server remembers
+who is typing where and emits 'user_typing' only when someone starts, and
+once more when they stop:
+
+- a keystroke from a user already typing just pushes their expiry back
+- an explicit stop is held for TYPING_DEBOUNCE_MS, so a pause mid-sentence
+  that is followed by more typing sends nothing
+- no keystroke for TYPING_EXPIRY_MS counts as a stop (closed tab, lost
+  connection)
+"""
+import os
+import threading
+import time
+
+TYPING_EXPIRY_MS = int(os.environ.get("TYPING_EXPIRY_MS", 5000))
+TYPING_DEBOUNCE_MS = int(os.environ.get("TYPING_DEBOUNCE_MS", 1000))
+# How often expired/debounced stops are swept and broadcast
+TYPING_SWEEP_MS = int(os.environ.get("TYPING_SWEEP_MS", 250))
+
+
+class TypingTracker:
+    def __init__(self, expiry_ms=TYPING_EXPIRY_MS, debounce_ms=TYPING_DEBOUNCE_MS, clock=time.monotonic):
+        self.expiry = expiry_ms / 1000
+        self.debounce = debounce_ms / 1000
+        self.clock = clock
+        self._typing = {}   # (room, user id) -> [deadline, sid]
+        self._lock = threading.Lock()
+
+    def is_typing(self, room, user_id):
+        return (room, user_id) in self._typing
+
+    def start(self, room, user_id, sid=None):
+        """Record a keystroke; return True if the user just started typing."""
+        deadline = self.clock() + self.expiry
+        with self._lock:
+            state = self._typing.get((room, user_id))
+            if state is not None:
+                state[0] = deadline
+                return False
+            self._typing[(room, user_id)] = [deadline, sid]
+            return True
+
+    def stop(self, room, user_id):
+        """Client says it stopped. Return True if that should be broadcast now,
+        False if it is left to expire() after the debounce (or wasn't typing)."""
+        with self._lock:
+            state = self._typing.get((room, user_id))
+            if state is None:
+                return False
+            if self.debounce <= 0:
+                del self._typing[(room, user_id)]
+                return True
+            state[0] = min(state[0], self.clock() + self.debounce)
+            return False
+
+    def clear(self, room, user_id):
+        """Forget the user's state at once (they sent the message); return
+        True if they were typing."""
+        with self._lock:
+            return self._typing.pop((room, user_id), None) is not None
+
+    def drop_sid(self, sid):
+        """Forget everything typed from a disconnected socket; return [(room, user id)]."""
+        with self._lock:
+            dropped = [key for key, (_, state_sid) in self._typing.items() if state_sid == sid]
+            for key in dropped:
+                del self._typing[key]
+        return dropped
+
+    def expire(self):
+        """Remove and return [(room, user id, sid)] whose deadline has passed."""
+        now = self.clock()
+        with self._lock:
+            expired = [(room, user_id, sid) for (room, user_id), (deadline, sid) in self._typing.items()
+                       if deadline <= now]
+            for room, user_id, _ in expired:
+                del self._typing[(room, user_id)]
+        return expired